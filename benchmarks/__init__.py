@@ -0,0 +1,11 @@
+import os
+
+# Settings requires these even when DATABASE_URL points at a local stand-in.
+# Benchmarks default to a scratch SQLite database; never point them at production.
+for name in ["DATABASE_HOSTNAME", "DATABASE_PORT", "DATABASE_PASSWORD", "DATABASE_NAME", "DATABASE_USERNAME"]:
+    os.environ.setdefault(name, "")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("DATABASE_CREATE_TABLES", "true")
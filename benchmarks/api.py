@@ -0,0 +1,76 @@
+"""
+Measures the hot API endpoints in-process through TestClient on the benchmark database.
+
+Each run first clears the benchmark user's rows and seeds a fixed number of records, so runs
+are comparable with each other.
+
+    python -m qr-fastapi-python.benchmarks.api --rows 2000 --iterations 200
+"""
+import argparse
+import itertools
+
+from fastapi.testclient import TestClient
+
+from ..config.config import settings
+from ..main import app
+from ..utility.enums import QRSourceEnum, UserRoleEnum
+from ..utility.oauth2 import create_access_token
+from . import harness
+from .decode import DENSITIES, render
+
+USER_ID = "benchmark-api"
+BULK_SIZE = 100
+
+
+def run(rows: int, iterations: int) -> dict:
+    qr_id = harness.seed(USER_ID, rows)
+    token = create_access_token({"sub": USER_ID, "name": "Benchmark", "role": UserRoleEnum.ADMIN.value})
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    counter = itertools.count()
+    image = render(DENSITIES["short"], 1024, "PNG")
+
+    def call(method: str, url: str, **kwargs):
+        def request():
+            response = client.request(method, url, **kwargs)
+            response.raise_for_status()
+        return request
+
+    def create():
+        response = client.post("/qr/", json={"data": f"https://example.com/new/{next(counter)}",
+                                             "path": "", "source": QRSourceEnum.DIRECT_VALUE.value})
+        response.raise_for_status()
+
+    def bulk():
+        base = next(counter)
+        response = client.post("/qr/bulk", json=[
+            {"data": f"https://example.com/bulk/{base}/{index}", "path": "", "source": QRSourceEnum.DIRECT_VALUE.value}
+            for index in range(BULK_SIZE)])
+        response.raise_for_status()
+
+    previous, settings.decode_cache_enabled = settings.decode_cache_enabled, False
+    try:
+        return {
+            "api/get-qr": harness.measure(call("GET", f"/qr/{qr_id}"), iterations),
+            "api/list-qr": harness.measure(call("GET", "/qr/?limit=100"), iterations),
+            "api/lookup-qr": harness.measure(call("GET", "/qr/lookup?data=https://example.com/item/7"), iterations),
+            "api/search-qr": harness.measure(call("GET", "/qr/search?q=item"), iterations),
+            "api/create-qr": harness.measure(create, iterations),
+            "api/bulk-qr": harness.measure(bulk, max(1, iterations // 10), units=BULK_SIZE),
+            "api/image-raw": harness.measure(
+                call("POST", "/qr/qr-image-raw", content=image, headers={"Content-Type": "image/png"}), iterations),
+        }
+    finally:
+        settings.decode_cache_enabled = previous
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    harness.print_results(run(args.rows, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compares the single-row create path of POST /qr/ with the executemany path of POST /qr/bulk.
+
+Run from the directory containing the project, against a scratch database:
+
+    DATABASE_URL=sqlite:///./bench.db python -m qr-fastapi-python.benchmarks.bulk_insert --rows 5000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import delete, insert
+
+from ..config import database
+from ..models import qrModel
+from ..routers.qr import new_qr_row
+from ..utility.enums import QRSourceEnum, UserRoleEnum
+from . import harness
+
+USER_ID = "benchmark-user"
+
+
+def single_row(db, user_id: str, rows: int) -> float:
+    started = time.perf_counter()
+    for index in range(rows):
+        db.add(qrModel.QR(id=str(uuid.uuid4()), path="bench", data=f"payload-{index}", created_at=datetime.now(),
+                          updated_at=datetime.now(), user_id=user_id, source=QRSourceEnum.DIRECT_VALUE,
+                          disabled=False))
+        db.commit()
+    return time.perf_counter() - started
+
+
+def bulk(db, user_id: str, rows: int) -> float:
+    started = time.perf_counter()
+    now = datetime.now()
+    db.execute(insert(qrModel.QR), [new_qr_row(f"payload-{index}", "bench", QRSourceEnum.DIRECT_VALUE, user_id, now)
+                                    for index in range(rows)])
+    db.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        user_id = harness.ensure_user(db, USER_ID, UserRoleEnum.USER)
+        results = {}
+        for name, run in [("single_row", single_row), ("bulk", bulk)]:
+            db.execute(delete(qrModel.QR).where(qrModel.QR.user_id == user_id))
+            db.commit()
+            seconds = run(db, user_id, args.rows)
+            results[name] = seconds
+            print(f"{name:>10}: {args.rows} rows in {seconds:.3f}s ({args.rows / seconds:,.0f} rows/s)")
+        db.execute(delete(qrModel.QR).where(qrModel.QR.user_id == user_id))
+        db.commit()
+        print(f"   speedup: {results['single_row'] / results['bulk']:.1f}x")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures qrUtil decoding over a generated corpus of QR images.
+
+The corpus crosses payload densities, image sizes and formats, so a change to the decode
+path shows which kinds of input it helps or hurts. The decode cache is turned off while
+measuring, so every call does the full decode.
+
+    python -m qr-fastapi-python.benchmarks.decode --iterations 20
+"""
+import argparse
+import io
+import itertools
+
+import qrcode
+from PIL import Image
+
+from ..config.config import settings
+from ..utility import qrUtil
+from . import harness
+
+DENSITIES = {
+    "short": "https://example.com/q/1",
+    "medium": "https://example.com/item/" + "x" * 200,
+    "dense": "D" * 1200,
+}
+SIZES = [256, 1024, 2048]
+FORMATS = ["PNG", "JPEG"]
+
+
+def render(payload: str, size: int, image_format: str) -> bytes:
+    """Renders payload as a QR code scaled to roughly size x size pixels, encoded as image_format."""
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=4)
+    code.add_data(payload)
+    code.make(fit=True)
+    img = code.make_image(fill_color="black", back_color="white").get_image().convert("L")
+    img = img.resize((size, size), Image.NEAREST)
+    buffer = io.BytesIO()
+    img.save(buffer, format=image_format, **({"quality": 85} if image_format == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def build_corpus() -> dict[str, tuple[str, bytes]]:
+    """Returns {benchmark name: (expected payload, encoded image)} for every combination."""
+    corpus = {}
+    for (density, payload), size, image_format in itertools.product(DENSITIES.items(), SIZES, FORMATS):
+        corpus[f"decode/{density}-{size}-{image_format.lower()}"] = (payload, render(payload, size, image_format))
+    return corpus
+
+
+def run(iterations: int) -> dict:
+    previous, settings.decode_cache_enabled = settings.decode_cache_enabled, False
+    try:
+        results = {}
+        for name, (payload, contents) in build_corpus().items():
+            decoded = qrUtil.decode_qr_from_file_content(contents)
+            if payload not in decoded:
+                print(f"warning: {name} did not decode to its payload")
+            results[name] = harness.measure(lambda: qrUtil.decode_qr_from_file_content(contents), iterations)
+        return results
+    finally:
+        settings.decode_cache_enabled = previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    harness.print_results(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Finds the fastest decoder backend that still decodes the whole corpus correctly.
+
+The corpus is every file listed in sample/expected.json: images, and JSON bodies holding
+a base64 image (as sent to POST /qr/qr-image-data). With --generated it also holds the
+generated corpus of the decode benchmark and rotated copies of it. Each backend runs
+alone through the full qrUtil pipeline (preprocessing and retries), with the decode
+cache off.
+
+    python -m qr-fastapi-python.benchmarks.decoders --iterations 10 --generated
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import time
+
+from PIL import Image
+
+from ..config.config import settings
+from ..utility import decoders, qrUtil
+from . import decode, harness
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample")
+
+
+def load_samples() -> dict[str, tuple[list[str], bytes]]:
+    """Returns {file name: (expected values, image bytes)} for sample/."""
+    with open(os.path.join(SAMPLE_DIR, "expected.json")) as f:
+        expected = json.load(f)
+    corpus = {}
+    for name, values in expected.items():
+        with open(os.path.join(SAMPLE_DIR, name), "rb") as f:
+            contents = f.read()
+        if name.endswith(".txt"):
+            contents = base64.b64decode(qrUtil.normalize_base64(json.loads(contents)["data"]))
+        corpus[f"sample/{name}"] = (values, contents)
+    return corpus
+
+
+def rotated(contents: bytes, degrees: float) -> bytes:
+    img = Image.open(io.BytesIO(contents)).convert("L").rotate(degrees, expand=True, fillcolor=255)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def build_corpus(generated: bool) -> dict[str, tuple[list[str], bytes]]:
+    corpus = load_samples()
+    if generated:
+        for name, (payload, contents) in decode.build_corpus().items():
+            corpus[name] = ([payload], contents)
+            if name.endswith("-1024-png"):
+                corpus[f"{name}-rotated"] = ([payload], rotated(contents, 30))
+    return corpus
+
+
+def run_backend(name: str, corpus: dict, iterations: int) -> dict:
+    """Decodes the corpus with one backend and returns its timings and the images it got wrong."""
+    settings.qr_decoder_backends = name
+    qrUtil.reset_decoder()
+    failures = [image for image, (expected, contents) in corpus.items()
+                if sorted(qrUtil.decode_qr_from_file_content(contents)) != sorted(expected)]
+
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for _, contents in corpus.values():
+            call_started = time.perf_counter()
+            qrUtil.decode_qr_from_file_content(contents)
+            timings.append((time.perf_counter() - call_started) * 1000)
+    result = harness.summarize(timings, time.perf_counter() - started)
+    result["correct"] = len(corpus) - len(failures)
+    result["failures"] = failures
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--generated", action="store_true", help="Add the generated and rotated corpus")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.generated)
+    previous = (settings.qr_decoder_backends, settings.decode_cache_enabled)
+    settings.decode_cache_enabled = False
+    results = {}
+    try:
+        for name in decoders.BACKENDS:
+            _, errors = decoders.load_backends([name])
+            if errors:
+                print(f"{name}: unavailable ({errors[name]})")
+                continue
+            results[name] = run_backend(name, corpus, args.iterations)
+    finally:
+        settings.qr_decoder_backends, settings.decode_cache_enabled = previous
+        qrUtil.reset_decoder()
+
+    if not results:
+        print("No decoder backend could be loaded")
+        return
+    harness.print_results({f"decoder/{name}": result for name, result in results.items()})
+    for name, result in results.items():
+        print(f"{name}: {result['correct']}/{len(corpus)} correct"
+              + (f", wrong: {', '.join(result['failures'])}" if result["failures"] else ""))
+    if args.output:
+        harness.save_results(args.output, {f"decoder/{name}": result for name, result in results.items()},
+                             {"iterations": args.iterations, "generated": args.generated})
+
+    # Most accurate first, fastest among equals; the rest of the chain catches what the first misses
+    ranked = sorted(results, key=lambda name: (-results[name]["correct"], results[name]["mean_ms"]))
+    if results[ranked[0]]["correct"] == len(corpus):
+        print(f"\nFastest fully correct backend: {ranked[0]}")
+    else:
+        print("\nNo backend decodes the whole corpus on its own")
+    print(f"Suggested setting: QR_DECODER_BACKENDS={','.join(ranked)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Timing, reporting, baseline comparison and database seeding shared by the benchmark suite.
+
+Results are plain JSON so a run can be kept as a baseline and compared against later:
+
+    {"meta": {...}, "results": {"<name>": {"count": ..., "throughput_per_s": ..., "p50_ms": ..., ...}}}
+"""
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert
+
+from ..config import database
+from ..models import qrModel, userModel
+from ..routers.qr import new_qr_row
+from ..utility.enums import QRSourceEnum, UserRoleEnum
+
+
+def ensure_user(db, user_id: str, role: UserRoleEnum = UserRoleEnum.ADMIN) -> str:
+    """Creates the benchmark user `user_id` unless it exists, and returns its id."""
+    if db.query(userModel.User).filter(userModel.User.id == user_id).first() is None:
+        db.add(userModel.User(id=user_id, name="Benchmark", email=f"{user_id}@example.com", password="-",
+                              role=role, created_at=datetime.now(), updated_at=datetime.now(),
+                              disabled=False))
+        db.commit()
+    return user_id
+
+
+def seed(user_id: str, rows: int) -> str | None:
+    """
+    Replaces the records of benchmark user `user_id` with `rows` fresh ones, a second apart,
+    so runs are comparable with each other. Returns the id of one of them.
+    """
+    db = database.SessionLocal()
+    try:
+        ensure_user(db, user_id)
+        db.execute(delete(qrModel.QR).where(qrModel.QR.user_id == user_id))
+        start = datetime.now()
+        db.execute(insert(qrModel.QR), [
+            new_qr_row(f"https://example.com/item/{index}", f"scan-{index}.png", QRSourceEnum.IMAGE_FILE, user_id,
+                       start - timedelta(seconds=index))
+            for index in range(rows)])
+        db.commit()
+        row = db.query(qrModel.QR.id).filter(qrModel.QR.user_id == user_id).first()
+        return row.id if row else None
+    finally:
+        db.close()
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Returns a linearly interpolated percentile of an already sorted, non-empty list."""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(timings_ms: list[float], elapsed_seconds: float, units: int = 1) -> dict:
+    """
+    Summarizes the per-call timings of one benchmark.
+
+    Args:
+        timings_ms: Duration of each call in milliseconds.
+        elapsed_seconds: Wall clock time of the whole measured loop.
+        units: Work items handled per call (e.g. rows per bulk request), for throughput.
+    """
+    ordered = sorted(timings_ms)
+    return {
+        "count": len(ordered),
+        "throughput_per_s": round(len(ordered) * units / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(percentile(ordered, 0.50), 3),
+        "p95_ms": round(percentile(ordered, 0.95), 3),
+        "p99_ms": round(percentile(ordered, 0.99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def measure(fn, iterations: int, warmup: int = 3, units: int = 1) -> dict:
+    """Calls fn() `warmup` times unmeasured, then `iterations` times, and summarizes the timings."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - call_started) * 1000)
+    return summarize(timings, time.perf_counter() - started, units)
+
+
+def print_results(results: dict):
+    width = max((len(name) for name in results), default=4)
+    print(f"{'name':<{width}}  {'count':>6}  {'ops/s':>10}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}")
+    for name, result in results.items():
+        print(f"{name:<{width}}  {result['count']:>6}  {result['throughput_per_s']:>10.1f}  "
+              f"{result['p50_ms']:>9.3f}  {result['p95_ms']:>9.3f}  {result['p99_ms']:>9.3f}")
+
+
+def save_results(path: str, results: dict, options: dict):
+    document = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "options": options,
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results: dict, baseline: dict, metric: str, tolerance: float) -> list[str]:
+    """
+    Prints every benchmark present in both runs next to its baseline.
+
+    Returns:
+        The names of benchmarks whose metric grew by more than `tolerance` (0.2 = 20%).
+    """
+    regressions = []
+    print(f"\nAgainst baseline ({metric}, tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"  {name}: new, no baseline")
+            continue
+        before, after = baseline[name][metric], result[metric]
+        change = (after - before) / before if before else 0.0
+        regressed = change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"  {name}: {before:.3f} -> {after:.3f} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return regressions
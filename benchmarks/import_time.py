@@ -0,0 +1,81 @@
+"""
+Checks the time to import the application against a budget, in fresh interpreters.
+
+It also fails when a dependency that should load lazily (Pillow, pyzbar, passlib,
+bcrypt, python-jose, qrcode) is imported by `main` itself.
+
+    python -m qr-fastapi-python.benchmarks.import_time --budget-ms 1500
+
+The exit status is 1 when the best of --runs imports exceeds the budget or a lazy
+dependency was imported. tests/test_import_time.py runs the same check under pytest.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PACKAGE = __package__.rpartition(".")[0]
+
+# The project root, holding main.py and .env
+ROOT = Path(__file__).resolve().parents[1]
+
+DEFAULT_BUDGET_MS = 1500
+
+LAZY_MODULES = ["PIL", "pyzbar", "passlib", "bcrypt", "jose", "qrcode"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {package}.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "modules": sorted({{name.split(".")[0] for name in sys.modules}})}}))
+"""
+
+
+def measure_import(package: str = PACKAGE) -> dict:
+    """Imports `<package>.main` in a new interpreter and returns its import time and top level modules."""
+    # Run from the project root, so .env is found, with its parent on the path for the package.
+    # The import must not touch a real database: it gets an in-memory one and creates no tables.
+    env = {**os.environ,
+           "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT.parent), os.environ.get("PYTHONPATH")])),
+           "DATABASE_URL": "sqlite://",
+           "DATABASE_REPLICA_URLS": "",
+           "DATABASE_CREATE_TABLES": "false"}
+    output = subprocess.run([sys.executable, "-c", PROBE.format(package=package)], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_import(runs: int, package: str = PACKAGE) -> tuple[list[float], list[str]]:
+    """Returns the sorted timings in milliseconds of `runs` imports, and the lazy modules any of them imported."""
+    results = [measure_import(package) for _ in range(runs)]
+    timings = sorted(result["ms"] for result in results)
+    eager = sorted({name for result in results for name in result["modules"] if name in LAZY_MODULES})
+    return timings, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5, help="Imports to run; the fastest one is checked")
+    args = parser.parse_args()
+
+    timings, eager = check_import(args.runs)
+
+    print(f"import {PACKAGE}.main: best {timings[0]:.1f} ms, median {timings[len(timings) // 2]:.1f} ms, "
+          f"budget {args.budget_ms:.0f} ms")
+    failed = False
+    if timings[0] > args.budget_ms:
+        print("FAIL: import time is over budget")
+        failed = True
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
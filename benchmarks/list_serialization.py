@@ -0,0 +1,57 @@
+"""
+Compares the default and the fast (API_FAST_SERIALIZATION) rendering of GET /qr/ pages.
+
+Run from the directory containing the project, against a scratch database:
+
+    python -m qr-fastapi-python.benchmarks.list_serialization --rows 1000 --requests 200
+"""
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from ..config.config import settings
+from ..main import app
+from ..utility.enums import UserRoleEnum
+from ..utility.oauth2 import create_access_token
+from . import harness
+
+USER_ID = "benchmark-admin"
+
+
+def measure(client: TestClient, headers: dict, requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get("/qr/?limit=100", headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    harness.seed(USER_ID, args.rows)
+    token = create_access_token({"sub": USER_ID, "name": "Benchmark", "role": UserRoleEnum.ADMIN.value})
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+
+    results = {}
+    for fast in (False, True):
+        settings.api_fast_serialization = fast
+        measure(client, headers, 10)  # warm up
+        timings = measure(client, headers, args.requests)
+        name = "fast" if fast else "default"
+        results[name] = statistics.mean(timings)
+        print(f"{name:>8}: mean {results[name]:.2f} ms, p50 {statistics.median(timings):.2f} ms, "
+              f"p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms per 100-row page")
+    print(f" speedup: {results['default'] / results['fast']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
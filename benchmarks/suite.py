@@ -0,0 +1,45 @@
+"""
+Runs the decode and API benchmarks, saves the results as JSON and compares them against a baseline.
+
+    python -m qr-fastapi-python.benchmarks.suite --output results.json --baseline baseline.json
+
+The exit status is 1 when any benchmark's p95 grew by more than --tolerance over the baseline,
+so the suite can gate a CI job. Create a baseline by saving a run from the reference commit.
+"""
+import argparse
+import sys
+
+from . import api, decode, harness
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", choices=["decode", "api"], help="Run one group of benchmarks")
+    parser.add_argument("--decode-iterations", type=int, default=20)
+    parser.add_argument("--api-iterations", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=2000, help="Records seeded for the API benchmarks")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against the results in this JSON file")
+    parser.add_argument("--metric", default="p95_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    results = {}
+    if args.only in (None, "decode"):
+        results.update(decode.run(args.decode_iterations))
+    if args.only in (None, "api"):
+        results.update(api.run(args.rows, args.api_iterations))
+    harness.print_results(results)
+
+    if args.output:
+        harness.save_results(args.output, results, {key: value for key, value in vars(args).items()
+                                                    if key not in ("output", "baseline")})
+    if args.baseline:
+        regressions = harness.compare(results, harness.load_results(args.baseline), args.metric, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
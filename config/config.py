@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,6 +10,63 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    refresh_token_expire_days: int = 30
+    auth_password_workers: int = 2
+    auth_user_cache_max_entries: int = 10000
+    auth_user_cache_ttl_seconds: float = 60
+    auth_trust_token_claims: bool = False
+    database_url: str | None = None
+    database_async_url: str | None = None
+    database_mode: Literal["sync", "async"] = "sync"
+    database_create_tables: bool = False
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    database_replica_urls: str = ""
+    database_replica_check_interval_seconds: float = 5
+    database_replica_read_your_writes_seconds: float = 5
+    qr_batch_max_files: int = 500
+    qr_upload_max_bytes: int = 10 * 1024 * 1024
+    qr_batch_max_total_bytes: int = 100 * 1024 * 1024
+    qr_export_batch_size: int = 1000
+    qr_bulk_max_items: int = 1000
+    qr_soft_delete: bool = False
+    qr_delete_batch_size: int = 1000
+    api_fast_serialization: bool = False
+    decode_pool_kind: Literal["thread", "process"] = "thread"
+    decode_workers: int = 4
+    decode_queue_size: int = 32
+    decode_job_timeout_seconds: float = 10.0
+    decode_retry_after_seconds: int = 2
+    decode_cache_enabled: bool = True
+    decode_cache_max_entries: int = 10000
+    decode_cache_ttl_seconds: float = 86400
+    decode_cache_sqlite_path: str | None = None
+    qr_preprocess_enabled: bool = True
+    qr_preprocess_max_dimension: int = 1280
+    qr_preprocess_retry: bool = True
+    qr_preprocess_threshold: int = 128
+    qr_decoder_backends: str = "pyzbar"
+    qr_max_frames: int = 100
+    qr_max_total_pixels: int = 150_000_000
+    qr_frame_workers: int = 0
+    qr_pdf_render_dpi: int = 150
+    qr_render_max_size: int = 4096
+    qr_render_cache_max_entries: int = 1000
+    qr_render_cache_ttl_seconds: float = 86400
+    qr_render_max_age_seconds: int = 86400
+    decode_job_workers: int = 2
+    decode_job_queue_size: int = 32
+    decode_job_retention_seconds: float = 3600
+    decode_job_max_entries: int = 10000
+    decode_job_sqlite_path: str | None = None
+    log_level: str = "INFO"
+    log_format: Literal["json", "text"] = "json"
+    log_slow_request_ms: float = 1000
+    metrics_enabled: bool = True
+    warmup_enabled: bool = True
 
     class Config:
         env_file = ".env"
@@ -1,11 +1,31 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from .dbPool import PoolMetrics, instrument_engine, pool_options
+from .replicas import ReplicaSet
+from ..utility.lruCache import TTLCache
 
-DB_URL = f"mysql+pymysql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+DB_URL = settings.database_url or f"mysql+pymysql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
 
-engine = create_engine(DB_URL)
+def to_async_url(url: str) -> str:
+    """Maps a sync database URL to the matching asyncio driver (aiomysql or aiosqlite)."""
+    if url.startswith("mysql+pymysql://") or url.startswith("mysql://"):
+        return "mysql+aiomysql://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+ASYNC_DB_URL = settings.database_async_url or to_async_url(DB_URL)
+
+def engine_connect_args(url: str) -> dict:
+    # SQLite connections are shared across the request threadpool
+    return {"check_same_thread": False} if url.startswith("sqlite") else {}
+
+engine = create_engine(DB_URL, connect_args=engine_connect_args(DB_URL), **pool_options(DB_URL, settings))
+
+pool_metrics = PoolMetrics()
+instrument_engine(engine, pool_metrics)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -17,3 +37,68 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# The async engine is only built in async mode, so its driver is not needed otherwise
+async_engine = None
+AsyncSessionLocal = None
+async_pool_metrics = PoolMetrics()
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(ASYNC_DB_URL, **pool_options(ASYNC_DB_URL, settings, is_async=True))
+        instrument_engine(async_engine.sync_engine, async_pool_metrics)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+# Optional read replicas. Reads routed through utility/dbRouting.py use them; writes,
+# and reads of users who wrote recently, stay on the primary engine above.
+REPLICA_URLS = [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
+
+replica_engines = [create_engine(url, connect_args=engine_connect_args(url), **pool_options(url, settings))
+                   for url in REPLICA_URLS]
+replica_pool_metrics = [PoolMetrics() for _ in replica_engines]
+for replica_engine, replica_metrics in zip(replica_engines, replica_pool_metrics):
+    instrument_engine(replica_engine, replica_metrics)
+
+ReplicaSessionLocals = [sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+                        for replica_engine in replica_engines]
+
+# Health checks run on the sync engines and also decide for the async ones
+replicas = ReplicaSet(replica_engines, settings.database_replica_check_interval_seconds)
+
+async_replica_engines = []
+AsyncReplicaSessionLocals = []
+
+def get_async_replica_sessionmakers() -> list:
+    global async_replica_engines, AsyncReplicaSessionLocals
+    if len(AsyncReplicaSessionLocals) != len(REPLICA_URLS):
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_replica_engines = [create_async_engine(to_async_url(url), **pool_options(url, settings, is_async=True))
+                                 for url in REPLICA_URLS]
+        AsyncReplicaSessionLocals = [async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+                                     for async_replica_engine in async_replica_engines]
+    return AsyncReplicaSessionLocals
+
+# Read-your-writes: the users who committed on the primary within the window
+recent_writers = TTLCache(10000, settings.database_replica_read_your_writes_seconds)
+
+@event.listens_for(Session, "after_commit")
+def note_write(session):
+    # oauth2.get_current_user tags the request session with the user id; AsyncSession
+    # commits through the same sync Session, so both modes are covered
+    user_id = session.info.get("user_id")
+    if user_id is None or not REPLICA_URLS:
+        return
+    recent_writers.set(user_id, True)
+
+def wrote_recently(user_id: str) -> bool:
+    """Whether the user committed on the primary within DATABASE_REPLICA_READ_YOUR_WRITES_SECONDS."""
+    return recent_writers.get(user_id, False)
@@ -0,0 +1,87 @@
+import itertools
+import logging
+import threading
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """
+    Read replicas handed out round-robin, skipping those whose last health check failed.
+
+    A daemon thread runs SELECT 1 on every replica each check_interval seconds, so
+    picking a replica never waits on a dead host. Replicas start out unhealthy: no read
+    goes to one before a check has passed.
+    """
+
+    def __init__(self, engines: list, check_interval: float):
+        self.engines = engines
+        self.check_interval = check_interval
+        self.healthy = [False] * len(engines)
+        self._checked = False
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.engines)
+
+    def start(self, check_now: bool = False):
+        """
+        Starts the health check thread.
+
+        Args:
+            check_now: Run the first check in the calling thread before returning, so the
+                replicas are usable at once (for startup; requests leave it to the thread).
+        """
+        if self._thread is not None or not self.engines:
+            return
+        with self._lock:
+            if self._thread is None:
+                if check_now:
+                    self.check()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, args=(check_now,), name="db-replica-check", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self, checked: bool):
+        if not checked:
+            self.check()
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """Runs the health check of every replica and records the results."""
+        for index, engine in enumerate(self.engines):
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                healthy = True
+            except Exception as e:
+                healthy = False
+                error = str(e)
+            if healthy and not self.healthy[index] and self._checked:
+                logger.info("Database replica is back", extra={"replica": index})
+            elif not healthy and (self.healthy[index] or not self._checked):
+                logger.warning("Database replica failed its health check", extra={"replica": index, "error": error})
+            self.healthy[index] = healthy
+        self._checked = True
+
+    def pick(self) -> int | None:
+        """Returns the index of the next healthy replica, or None when none is healthy."""
+        self.start()
+        for _ in range(len(self.engines)):
+            index = next(self._counter) % len(self.engines)
+            if self.healthy[index]:
+                return index
+        return None
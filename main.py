@@ -1,12 +1,81 @@
 # main.py
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 # Import the authentication router and dependencies
-from .routers import auth, user, qr
+from .routers import auth, user, qr, admin, health
+from .config import database
+from .config.config import settings
+from .utility import dbRouting, decodeEngine, decodeJobs, logs, metrics, oauth2, qrSearch, qrUtil
+
+logs.configure_logging(settings.log_level, settings.log_format)
+
+logger = logging.getLogger(__name__)
+
+def warm_up():
+    """
+    Loads the heavy dependencies kept out of import time (Pillow, pyzbar/ZBar, passlib/bcrypt,
+    python-jose), starts the decode pool and opens a first database connection, so the first
+    requests do not pay for them. A failure is logged and leaves the worker running; /readyz
+    reports it.
+    """
+    started = time.perf_counter()
+    try:
+        qrUtil.load_decoder()
+    except qrUtil.DecoderUnavailableError:
+        pass  # Already logged by load_decoder; image endpoints answer 503 until fixed
+    auth.get_pwd_context()
+    oauth2.load_jwt()
+    decodeEngine.get_engine()
+    database.replicas.start(check_now=True)
+    if settings.database_mode != "async":
+        database_error = health.check_database()
+        if database_error:
+            logger.warning("Database not reachable during warm-up", extra={"error": database_error})
+    logger.info("Warm-up finished", extra={"duration_ms": round((time.perf_counter() - started) * 1000, 3)})
+
+def ensure_search_index():
+    """
+    Installs the search index on a SQLite primary created before it; create_all covers new
+    ones. Replicas only receive what the primary writes, so they are left alone.
+    """
+    try:
+        qrSearch.ensure_search_index(database.engine)
+    except Exception as e:
+        # /qr/search fails until fixed; everything else keeps working
+        logger.warning("Could not install the search index", extra={"error": str(e)})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(ensure_search_index)
+    if settings.warmup_enabled:
+        await run_in_threadpool(warm_up)
+        if settings.database_mode == "async":
+            database_error = await health.check_database_async()
+            if database_error:
+                logger.warning("Database not reachable during warm-up", extra={"error": database_error})
+    yield
+    decodeJobs.shutdown_pool()
+    decodeEngine.shutdown_engine()
+    database.replicas.stop()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    for async_replica_engine in database.async_replica_engines:
+        await async_replica_engine.dispose()
+    database.engine.dispose()
+    for replica_engine in database.replica_engines:
+        replica_engine.dispose()
 
+app = FastAPI(title="QR Reader", lifespan=lifespan)
 
-app = FastAPI(title="QR Reader")
+# Errors of routes that read from a replica name the database they read, like their successes
+app.add_exception_handler(StarletteHTTPException, dbRouting.read_from_exception_handler)
 
 origins = ["*"]
 
@@ -16,13 +85,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers only let scripts read safelisted response headers unless they are exposed
+    expose_headers=["X-Next-Cursor", "ETag", "X-Read-From"],
 )
 
+if settings.metrics_enabled:
+    metrics.instrument_queries()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return metrics.metrics_response()
+
+def prefer_async_routes(sync_router: APIRouter, async_router: APIRouter) -> APIRouter:
+    """
+    Replaces each route of sync_router with the async_router route of the same path
+    and methods. The sync route order is kept, so static paths still match before
+    '/{id}'; routes without an async counterpart stay sync.
+    """
+    async_routes = {(route.path, frozenset(route.methods)): route for route in async_router.routes}
+    merged = APIRouter()
+    for route in sync_router.routes:
+        merged.routes.append(async_routes.pop((route.path, frozenset(route.methods)), route))
+    merged.routes.extend(async_routes.values())
+    return merged
+
+if settings.database_create_tables:
+    # Local stand-in databases (e.g. SQLite) have no seed.sql schema
+    database.Base.metadata.create_all(bind=database.engine)
+    for index, replica_engine in enumerate(database.replica_engines):
+        try:
+            database.Base.metadata.create_all(bind=replica_engine)
+        except Exception as e:
+            # An unreachable replica is left to the health checks, the primary serves its reads
+            logger.warning("Could not create tables on a database replica", extra={"replica": index, "error": str(e)})
+
 # Include the authentication router
 # All routes defined in auth_router will be available under the /auth prefix
-app.include_router(auth.router)
-app.include_router(user.router)
-app.include_router(qr.router)
+if settings.database_mode == "async":
+    from .routers import authAsync, userAsync, qrAsync
+
+    app.include_router(prefer_async_routes(auth.router, authAsync.router))
+    app.include_router(prefer_async_routes(user.router, userAsync.router))
+    app.include_router(prefer_async_routes(qr.router, qrAsync.router))
+else:
+    app.include_router(auth.router)
+    app.include_router(user.router)
+    app.include_router(qr.router)
+app.include_router(admin.router)
+app.include_router(health.router)
 
 @app.get("/")
 def read_root():
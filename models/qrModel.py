@@ -1,22 +1,53 @@
-from sqlalchemy import Column, String, Text, ForeignKey, Boolean
+import hashlib
+
+from sqlalchemy import Column, String, Text, ForeignKey, Boolean, Index, event, false
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql.expression import text
+from sqlalchemy.sql import func
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
 from ..config.database import Base
 
+def data_digest(data: str) -> str:
+    """The fixed-width SHA-256 hex digest of a QR payload, stored in qr.data_hash."""
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
 class QR(Base):
     __tablename__ = "qr"
     id = Column(String, primary_key=True, nullable=False, unique=True)
     path = Column(Text, nullable=False, default='')
     data = Column(Text, nullable=False)
+    # NULL only for rows written before the column existed, until backfilled
+    data_hash = Column(String(64), nullable=True)
     source = Column(String, nullable=False)
+    # The decoder backend that read the image, for records decoded from one
+    decoder = Column(String(16), nullable=True)
+    # Set by soft deletes (QR_SOFT_DELETE); such rows are hidden from every read
     disabled = Column(Boolean, default=False, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True),
-                        nullable=False, server_default=text('now()'))
+                        nullable=False, server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True),
-                        nullable=False, server_default=text('now()'))
+                        nullable=False, server_default=func.now())
     user_id = Column(String, ForeignKey(
         "users.id", ondelete="CASCADE"), nullable=False)
 
     user = relationship("User")
+
+    # Keyset pagination reads the rows that are not soft deleted in (created_at, id) order,
+    # per owner or across all rows
+    __table_args__ = (
+        Index("ix_qr_user_disabled_created_id", "user_id", "disabled", "created_at", "id"),
+        Index("ix_qr_disabled_created_id", "disabled", "created_at", "id"),
+        Index("ix_qr_user_data_hash", "user_id", "data_hash"),
+        # Backs GET /qr/search; SQLite uses the qr_fts table from utility/qrSearch.py instead
+        Index("ft_qr_data_path", "data", "path", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
+
+# The filter of every read; an equality, so the indexes above serve it
+QR_ACTIVE = QR.disabled == false()
+
+@event.listens_for(QR, "before_insert")
+@event.listens_for(QR, "before_update")
+def set_data_hash(mapper, connection, target):
+    # Core inserts set data_hash themselves (see routers.qr.new_qr_row)
+    if target.data is not None:
+        target.data_hash = data_digest(target.data)
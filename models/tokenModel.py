@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, ForeignKey, Boolean, DateTime, Index
+from sqlalchemy.sql import func
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+
+from ..config.database import Base
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    id = Column(String(36), primary_key=True, nullable=False, unique=True)
+    # Every token rotated out of the same login shares its family_id
+    family_id = Column(String(36), nullable=False)
+    token_hash = Column(String(64), nullable=False)
+    user_id = Column(String(36), ForeignKey(
+        "users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked = Column(Boolean, default=False, nullable=False)
+    replaced_by = Column(String(36), nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True),
+                        nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_family_id", "family_id"),
+        Index("ix_refresh_tokens_user_id", "user_id"),
+    )
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Enum, Boolean
-from sqlalchemy.sql.expression import text
+from sqlalchemy import Column, String, Enum, Boolean, Index
+from sqlalchemy.sql import func
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
 from ..utility.enums import UserRoleEnum
@@ -14,6 +14,10 @@ class User(Base):
     role = Column(Enum(UserRoleEnum), default=UserRoleEnum.USER, nullable=False)
     disabled = Column(Boolean, default=False, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True),
-                        nullable=False, server_default=text('now()'))
+                        nullable=False, server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True),
-                        nullable=False, server_default=text('now()'))
+                        nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_users_created_id", "created_at", "id"),
+    )
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, Query, status, HTTPException
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from ..utility import oauth2, decodeEngine, decodeCache, qrRender
+from ..models import userModel, qrModel
+from ..config import database
+
+router = APIRouter(
+    prefix="/admin",
+    tags=['Admin']
+)
+
+database_dependency: Session = Depends(database.get_db)
+
+get_user_dependency: userModel.User = Depends(oauth2.get_current_user)
+
+def require_admin(current_user):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+
+@router.get('/decode-engine')
+def get_decode_engine_stats(current_user = get_user_dependency):
+    require_admin(current_user)
+    return decodeEngine.get_engine().stats()
+
+@router.get('/decode-cache')
+def get_decode_cache_stats(current_user = get_user_dependency):
+    require_admin(current_user)
+    cache = decodeCache.get_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get('/render-cache')
+def get_render_cache_stats(current_user = get_user_dependency):
+    require_admin(current_user)
+    return qrRender.get_cache().stats()
+
+@router.get('/db-pool')
+def get_db_pool_stats(current_user = get_user_dependency):
+    require_admin(current_user)
+    stats = {"sync": database.pool_metrics.snapshot(database.engine.pool)}
+    if database.async_engine is not None:
+        stats["async"] = database.async_pool_metrics.snapshot(database.async_engine.sync_engine.pool)
+    if database.replica_engines:
+        stats["replicas"] = [{"healthy": healthy, **metrics.snapshot(replica_engine.pool)}
+                             for replica_engine, metrics, healthy in
+                             zip(database.replica_engines, database.replica_pool_metrics, database.replicas.healthy)]
+    return stats
+
+def backfill_data_hash(db, batch_size: int, max_rows: int) -> int:
+    """
+    Fills qr.data_hash for rows written before the column existed.
+
+    Rows are handled in batches of batch_size, each in its own short transaction,
+    so the backfill never holds locks on a large part of the table.
+    """
+    updated = 0
+    statement = update(qrModel.QR.__table__).where(qrModel.QR.__table__.c.id == bindparam('row_id')) \
+        .values(data_hash=bindparam('row_hash'))
+    while updated < max_rows:
+        rows = db.query(qrModel.QR.id, qrModel.QR.data).filter(qrModel.QR.data_hash.is_(None)) \
+            .limit(min(batch_size, max_rows - updated)).all()
+        if not rows:
+            break
+        db.execute(statement, [{"row_id": row.id, "row_hash": qrModel.data_digest(row.data)} for row in rows])
+        db.commit()
+        updated += len(rows)
+    return updated
+
+@router.post('/backfill/data-hash')
+def run_backfill_data_hash(batch_size: int = Query(1000, gt=0, le=10000), max_rows: int = Query(100000, gt=0),
+                           db = database_dependency, current_user = get_user_dependency):
+    require_admin(current_user)
+    updated = backfill_data_hash(db, batch_size, max_rows)
+    remaining = db.query(qrModel.QR.id).filter(qrModel.QR.data_hash.is_(None)).limit(1).first() is not None
+    return {"updated": updated, "remaining": remaining}
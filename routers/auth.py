@@ -1,14 +1,18 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import uuid
 
 from ..config import database
 from ..schemas import schemas, userSchemas
+from ..utility import oauth2
 from ..utility.oauth2 import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
-from ..models import userModel
+from ..models import userModel, tokenModel
 from ..config.config import settings
 from ..utility.enums import UserRoleEnum
 
@@ -16,30 +20,99 @@ router = APIRouter(
     prefix="/auth",
     tags=['Authentication'])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@functools.cache
+def get_pwd_context():
+    """Builds the passlib context on first use or in the warm-up, keeping passlib and bcrypt out of import time."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt gets its own small pool, so a login burst cannot take every request thread
+password_executor = ThreadPoolExecutor(max_workers=settings.auth_password_workers,
+                                       thread_name_prefix="bcrypt")
 
 database_dependency: Session = Depends(database.get_db)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hashes a plain password."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifies a password on the bcrypt pool without holding a request thread."""
+    return await asyncio.get_running_loop().run_in_executor(
+        password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(password_executor, get_password_hash, password)
+
+def invalid_refresh_token_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def check_login_user(existingUser, password_ok: bool):
+    if not existingUser or not password_ok:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if existingUser.disabled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user",
+        )
+
+def create_token_pair(user: userModel.User, family_id: str | None = None) -> tuple[dict, tokenModel.RefreshToken]:
+    """Builds the access and refresh token response; the caller saves the returned refresh token row."""
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.id, "name": user.name, "role": user.role}, 
+        expires_delta=access_token_expires
+    )
+    refresh_token, refreshRow = oauth2.create_refresh_token(user.id, family_id)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}, refreshRow
+
+def find_user_by_email(db, email: str):
+    return db.query(userModel.User).filter(userModel.User.email == email).first()
+
+def save_user(db, user: userModel.User) -> userModel.User:
+    db.add(user)
+    db.commit()
+    # Loaded here, so serializing the response does not query from the event loop
+    db.refresh(user)
+    return user
+
+def save_token_pair(db, user: userModel.User) -> dict:
+    tokens, refreshRow = create_token_pair(user)
+    db.add(refreshRow)
+    db.commit()
+    return tokens
+
+async def authenticate(db, email: str, password: str) -> dict:
+    # DB work runs on the request threadpool, bcrypt on its own pool
+    existingUser = await run_in_threadpool(find_user_by_email, db, email)
+    password_ok = existingUser is not None and await verify_password_async(password, existingUser.password)
+    check_login_user(existingUser, password_ok)
+    return await run_in_threadpool(save_token_pair, db, existingUser)
 
 
 @router.post('/register', status_code=status.HTTP_201_CREATED, response_model=userSchemas.User)
-def login(userRegisterObject: userSchemas.UserCreate, db = database_dependency):
+async def register(userRegisterObject: userSchemas.UserCreate, db = database_dependency):
     # Check if user already exists
-    existingUser = db.query(userModel.User).filter(userModel.User.email == userRegisterObject.email).first()
-    if existingUser:
+    if await run_in_threadpool(find_user_by_email, db, userRegisterObject.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Email '{userRegisterObject.email}' is already registered."
         )
 
-    hashed_password = get_password_hash(userRegisterObject.password)
+    # Awaited, so no request thread waits on bcrypt
+    hashed_password = await get_password_hash_async(userRegisterObject.password)
 
     # Create the user object to be stored in the "database"
     newUser = userModel.User(
@@ -54,56 +127,56 @@ def login(userRegisterObject: userSchemas.UserCreate, db = database_dependency):
     )
 
     # Add user to the database
-    db.add(newUser)
-    db.commit()
-    return newUser
+    return await run_in_threadpool(save_user, db, newUser)
 
 @router.post('/login', response_model=schemas.Token)
-def login(userLoginObject: userSchemas.UserLoginObject, db = database_dependency):
-    existingUser = db.query(userModel.User).filter(userModel.User.email == userLoginObject.email).first()
-    
-    if not existingUser or not verify_password(userLoginObject.password, existingUser.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    if existingUser.disabled:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Inactive user",
-        )
-
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": existingUser.id, "name": existingUser.name, "role": existingUser.role}, 
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+async def login(userLoginObject: userSchemas.UserLoginObject, db = database_dependency):
+    return await authenticate(db, userLoginObject.email, userLoginObject.password)
 
 
 @router.post('/token', response_model=schemas.Token)
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db = database_dependency):
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db = database_dependency):
+    return await authenticate(db, user_credentials.username, user_credentials.password)
+
+
+@router.post('/refresh', response_model=schemas.Token)
+def refresh(refreshObject: schemas.RefreshTokenRequest, db = database_dependency):
+    """Exchanges a refresh token for a new access token and a rotated refresh token, without bcrypt."""
+    tokenId, secret = oauth2.split_refresh_token(refreshObject.refresh_token, invalid_refresh_token_exception())
+    storedToken = db.query(tokenModel.RefreshToken).filter(tokenModel.RefreshToken.id == tokenId).with_for_update().first()
+
+    if not storedToken or not oauth2.refresh_token_matches(storedToken, secret):
+        raise invalid_refresh_token_exception()
+    if storedToken.revoked:
+        # A rotated token came back: assume it leaked and revoke its whole family
+        db.query(tokenModel.RefreshToken).filter(tokenModel.RefreshToken.family_id == storedToken.family_id) \
+            .update({tokenModel.RefreshToken.revoked: True}, synchronize_session=False)
+        db.commit()
+        raise invalid_refresh_token_exception()
+    if oauth2.refresh_token_expired(storedToken):
+        raise invalid_refresh_token_exception()
+
+    user = db.query(userModel.User).filter(userModel.User.id == storedToken.user_id).first()
+    if not user or user.disabled:
+        raise invalid_refresh_token_exception()
+
+    tokens, refreshRow = create_token_pair(user, storedToken.family_id)
+    storedToken.revoked = True
+    storedToken.replaced_by = refreshRow.id
+    db.add(refreshRow)
+    db.commit()
+    return tokens
 
-    existingUser = db.query(userModel.User).filter(userModel.User.email == user_credentials.username).first()
-    
-    if not existingUser or not verify_password(user_credentials.password, existingUser.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    if existingUser.disabled:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Inactive user",
-        )
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": existingUser.id, "name": existingUser.name, "role": existingUser.role}, 
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+@router.post('/logout', status_code=status.HTTP_200_OK)
+def logout(refreshObject: schemas.RefreshTokenRequest, db = database_dependency):
+    """Revokes a refresh token and every token rotated from the same login."""
+    tokenId, secret = oauth2.split_refresh_token(refreshObject.refresh_token, invalid_refresh_token_exception())
+    storedToken = db.query(tokenModel.RefreshToken).filter(tokenModel.RefreshToken.id == tokenId).first()
+    if not storedToken or not oauth2.refresh_token_matches(storedToken, secret):
+        raise invalid_refresh_token_exception()
+
+    db.query(tokenModel.RefreshToken).filter(tokenModel.RefreshToken.family_id == storedToken.family_id) \
+        .update({tokenModel.RefreshToken.revoked: True}, synchronize_session=False)
+    db.commit()
+    return "Logged out successfully"
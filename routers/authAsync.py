@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, update
+from datetime import datetime
+import uuid
+
+from ..config import database
+from ..schemas import schemas, userSchemas
+from ..models import userModel, tokenModel
+from ..utility import oauth2
+from ..utility.enums import UserRoleEnum
+from .auth import check_login_user, create_token_pair, get_password_hash_async, invalid_refresh_token_exception, verify_password_async
+
+# Async counterparts of the routes in auth.py, used when DATABASE_MODE=async
+router = APIRouter(
+    prefix="/auth",
+    tags=['Authentication'])
+
+database_dependency = Depends(database.get_async_db)
+
+async def find_user_by_email(db, email: str):
+    return (await db.execute(select(userModel.User).where(userModel.User.email == email))).scalars().first()
+
+async def authenticate(db, email: str, password: str):
+    existingUser = await find_user_by_email(db, email)
+
+    # bcrypt is CPU bound, keep it off the event loop
+    password_ok = existingUser is not None and await verify_password_async(password, existingUser.password)
+    check_login_user(existingUser, password_ok)
+
+    tokens, refreshRow = create_token_pair(existingUser)
+    db.add(refreshRow)
+    await db.commit()
+    return tokens
+
+@router.post('/register', status_code=status.HTTP_201_CREATED, response_model=userSchemas.User)
+async def register(userRegisterObject: userSchemas.UserCreate, db = database_dependency):
+    if await find_user_by_email(db, userRegisterObject.email):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Email '{userRegisterObject.email}' is already registered."
+        )
+
+    hashed_password = await get_password_hash_async(userRegisterObject.password)
+
+    newUser = userModel.User(
+        id= str(uuid.uuid4()),
+        name=userRegisterObject.name,
+        email=userRegisterObject.email,
+        password=hashed_password,
+        role= UserRoleEnum.USER,
+        created_at= datetime.now(),
+        updated_at=datetime.now(),
+        disabled=False
+    )
+
+    db.add(newUser)
+    await db.commit()
+    return newUser
+
+@router.post('/login', response_model=schemas.Token)
+async def login(userLoginObject: userSchemas.UserLoginObject, db = database_dependency):
+    return await authenticate(db, userLoginObject.email, userLoginObject.password)
+
+@router.post('/token', response_model=schemas.Token)
+async def login_for_token(user_credentials: OAuth2PasswordRequestForm = Depends(), db = database_dependency):
+    return await authenticate(db, user_credentials.username, user_credentials.password)
+
+def revoke_family_statement(family_id: str):
+    return update(tokenModel.RefreshToken).where(tokenModel.RefreshToken.family_id == family_id).values(revoked=True)
+
+@router.post('/refresh', response_model=schemas.Token)
+async def refresh(refreshObject: schemas.RefreshTokenRequest, db = database_dependency):
+    tokenId, secret = oauth2.split_refresh_token(refreshObject.refresh_token, invalid_refresh_token_exception())
+    storedToken = (await db.execute(select(tokenModel.RefreshToken).where(tokenModel.RefreshToken.id == tokenId)
+                                    .with_for_update())).scalars().first()
+
+    if not storedToken or not oauth2.refresh_token_matches(storedToken, secret):
+        raise invalid_refresh_token_exception()
+    if storedToken.revoked:
+        # A rotated token came back: assume it leaked and revoke its whole family
+        await db.execute(revoke_family_statement(storedToken.family_id))
+        await db.commit()
+        raise invalid_refresh_token_exception()
+    if oauth2.refresh_token_expired(storedToken):
+        raise invalid_refresh_token_exception()
+
+    user = (await db.execute(select(userModel.User).where(userModel.User.id == storedToken.user_id))).scalars().first()
+    if not user or user.disabled:
+        raise invalid_refresh_token_exception()
+
+    tokens, refreshRow = create_token_pair(user, storedToken.family_id)
+    storedToken.revoked = True
+    storedToken.replaced_by = refreshRow.id
+    db.add(refreshRow)
+    await db.commit()
+    return tokens
+
+@router.post('/logout', status_code=status.HTTP_200_OK)
+async def logout(refreshObject: schemas.RefreshTokenRequest, db = database_dependency):
+    tokenId, secret = oauth2.split_refresh_token(refreshObject.refresh_token, invalid_refresh_token_exception())
+    storedToken = (await db.execute(select(tokenModel.RefreshToken).where(tokenModel.RefreshToken.id == tokenId))).scalars().first()
+    if not storedToken or not oauth2.refresh_token_matches(storedToken, secret):
+        raise invalid_refresh_token_exception()
+
+    await db.execute(revoke_family_statement(storedToken.family_id))
+    await db.commit()
+    return "Logged out successfully"
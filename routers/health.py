@@ -0,0 +1,67 @@
+import logging
+
+from fastapi import APIRouter, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from ..config import database
+from ..config.config import settings
+from ..utility import qrUtil
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=['Health'])
+
+
+def check_database() -> str | None:
+    """Runs SELECT 1 on a pooled connection. Returns None when it works, the error message otherwise."""
+    try:
+        with database.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return str(e)
+    return None
+
+
+async def check_database_async() -> str | None:
+    try:
+        database.get_async_sessionmaker()
+        async with database.async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def check_decoder() -> str | None:
+    """Loads the decoder if the warm-up has not. Returns None when it is usable, the error message otherwise."""
+    try:
+        qrUtil.load_decoder()
+    except qrUtil.DecoderUnavailableError as e:
+        return str(e)
+    return None
+
+
+@router.get('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests. Checks no dependency."""
+    return {"status": "ok"}
+
+
+@router.get('/readyz')
+async def readyz():
+    """Readiness: the QR decoder is loaded and the database answers through the connection pool."""
+    if settings.database_mode == "async":
+        database_error = await check_database_async()
+    else:
+        database_error = await run_in_threadpool(check_database)
+    checks = {
+        "decoder": check_decoder() or "ok",
+        "database": database_error or "ok",
+    }
+    ready = all(result == "ok" for result in checks.values())
+    if not ready:
+        logger.warning("Not ready", extra=checks)
+    return JSONResponse({"status": "ready" if ready else "not ready", "checks": checks},
+                        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
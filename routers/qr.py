@@ -1,14 +1,24 @@
+import csv
+import io
+import json
+import logging
 from datetime import datetime
 import uuid
-from fastapi import APIRouter, Depends, File, Query, UploadFile, status, HTTPException
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
 from typing import Annotated, List
 
-from ..utility import oauth2, qrUtil
+from ..utility import oauth2, qrUtil, qrRender, decodeEngine, decodeJobs, dbRouting, httpCache, uploads, pagination, qrSearch
 from ..config import database
 from ..schemas import qrSchemas, schemas
 from ..models import qrModel, userModel
-from ..utility.enums import QRSourceEnum
+from ..utility.enums import DecodeJobStatusEnum, ExportFormatEnum, QRSourceEnum
+from ..config.config import settings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/qr",
@@ -17,126 +27,626 @@ router = APIRouter(
 
 database_dependency: Session = Depends(database.get_db)
 
+# Read-only routes may be served by a replica, see utility/dbRouting.py
+read_database_dependency: Session = Depends(dbRouting.get_read_db)
+
 get_user_dependency: userModel.User = Depends(oauth2.get_current_user)
 
-@router.get('/{id}', response_model=qrSchemas.QR)
-def get_qr(id: str, db = database_dependency, current_user = get_user_dependency):
+get_reader_dependency: userModel.User = Depends(oauth2.get_current_user_readonly)
+
+DECODER_ERRORS = (decodeEngine.DecodeQueueFullError, decodeEngine.DecodeTimeoutError, qrUtil.DecoderUnavailableError)
+
+def decoder_busy_exception(e: Exception) -> HTTPException:
+    """
+    Maps decode engine backpressure (queue full or job timeout) to a 503 with Retry-After,
+    and a decoder that failed to load to a plain 503.
+    """
+    if isinstance(e, qrUtil.DecoderUnavailableError):
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="QR decoder is unavailable.")
+    if isinstance(e, decodeEngine.DecodeTimeoutError):
+        detail = "QR decoding timed out. Please retry later."
+    else:
+        detail = "QR decoder is busy. Please retry later."
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail,
+                         headers={"Retry-After": str(settings.decode_retry_after_seconds)})
+
+async def decode_on_engine(contents: bytes) -> qrUtil.DecodedValues:
+    """
+    Awaits the decode of image bytes on the decode engine, mapping backpressure to 503.
+
+    Awaited rather than waited on from a threadpool thread: up to DECODE_WORKERS +
+    DECODE_QUEUE_SIZE uploads may wait on the engine, and holding a thread each would
+    starve the threadpool every other sync route runs on. The decode cache is read and
+    filled here rather than in the pool, so it is shared by every worker and its counters
+    are real with DECODE_POOL_KIND=process too.
+    """
+    # Hashing and the shared cache tier block, so they run off the event loop
+    key, cached = await run_in_threadpool(qrUtil.lookup_decoded, contents)
+    if cached is not None:
+        return cached
+    try:
+        qrData = await decodeEngine.get_engine().run_async(qrUtil.decode_qr_from_image_bytes, contents)
+    except DECODER_ERRORS as e:
+        raise decoder_busy_exception(e)
+    qrUtil.observe_decoded(qrData)
+    await run_in_threadpool(qrUtil.store_decoded, key, qrData)
+    return qrData
+
+def read_base64_image(qr: qrSchemas.QRBase) -> bytes:
+    """Returns the image bytes of a base64 image request, or raises 400 when it is not valid Base64."""
+    uploads.check_base64_length(qr.data)
+    contents = qrUtil.decode_base64_image(qr.data)
+    if not contents:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="QR Data is not valid. Please try encode QR string without header.")
+    return contents
+
+FAST_QR_COLUMNS = [getattr(qrModel.QR, field) for field in qrSchemas.QR_FIELDS] + [qrModel.QR.created_at, qrModel.QR.updated_at]
+
+def new_qr_row(data: str, path: str, source: QRSourceEnum, user_id: str, now: datetime, decoder: str | None = None) -> dict:
+    """Builds the column values of a new qr row for a Core (executemany) insert."""
+    return dict(
+        id=str(uuid.uuid4()),
+        path=path,
+        data=data,
+        data_hash=qrModel.data_digest(data),
+        created_at=now,
+        updated_at=now,
+        user_id=user_id,
+        source=source.value,
+        decoder=decoder,
+        disabled=False
+    )
+
+def find_existing_qr(db, user_id: str, data: str):
+    """Finds a QR of the user holding exactly data, through the (user_id, data_hash) index."""
+    return db.query(qrModel.QR).filter(qrModel.QR.user_id == user_id,
+                                       qrModel.QR.data_hash == qrModel.data_digest(data),
+                                       qrModel.QR.data == data, qrModel.QR_ACTIVE).first()
+
+def save_qr(db, data: str, path: str, source: QRSourceEnum, current_user, dedupe: bool, response: Response, decoder: str | None = None):
+    """
+    Inserts a QR row for the current user. With dedupe, an existing row holding the
+    same data is returned with 200 instead, and nothing is inserted.
+    """
+    if dedupe:
+        existingQr = find_existing_qr(db, current_user.id, data)
+        if existingQr:
+            response.status_code = status.HTTP_200_OK
+            return existingQr
+    newQr = qrModel.QR(**new_qr_row(data, path, source, current_user.id, datetime.now(), decoder))
+    db.add(newQr)
+    db.commit()
+    # Loaded here, so async routes do not query while serializing the response
+    db.refresh(newQr)
+    return newQr
+
+def run_decode_job(job: dict, contents: bytes, path: str, source: QRSourceEnum, user_id: str, dedupe: bool):
+    """
+    Runs on the job pool: decodes the image bytes on the decode engine, through the decode
+    cache, stores the QR row as save_qr would and records the outcome on the job.
+    """
+    decodeJobs.update(job, DecodeJobStatusEnum.RUNNING)
+    try:
+        key, qrData = qrUtil.lookup_decoded(contents)
+        if qrData is None:
+            # Waits for a decode engine slot instead of failing at once, the client is not waiting;
+            # the decode itself is still bounded by the job timeout
+            engine = decodeEngine.get_engine()
+            qrData = engine.wait(engine.submit(qrUtil.decode_qr_from_image_bytes, contents, block=True))
+            qrUtil.observe_decoded(qrData)
+            qrUtil.store_decoded(key, qrData)
+        if not qrData:
+            decodeJobs.update(job, DecodeJobStatusEnum.FAILED,
+                              error=qrData.error or "QR Image is not valid. Please try with other QR.")
+            return
+        data = qrUtil.join_decoded_values(qrData)
+        db = database.SessionLocal(info={"user_id": user_id})
+        try:
+            qr = find_existing_qr(db, user_id, data) if dedupe else None
+            if qr is None:
+                qr = qrModel.QR(**new_qr_row(data, path, source, user_id, datetime.now(), qrData.backend))
+                db.add(qr)
+                db.commit()
+            result = qrSchemas.QR.model_validate(qr).model_dump(mode="json")
+        finally:
+            db.close()
+        decodeJobs.update(job, DecodeJobStatusEnum.SUCCEEDED, qr=result)
+    except DECODER_ERRORS as e:
+        decodeJobs.update(job, DecodeJobStatusEnum.FAILED, error=decoder_busy_exception(e).detail)
+    except Exception:
+        logger.exception("Decode job failed", extra={"job_id": job["id"]})
+        decodeJobs.update(job, DecodeJobStatusEnum.FAILED, error="QR could not be stored. Please retry.")
+
+def accept_decode_job(contents: bytes, path: str, source: QRSourceEnum, current_user, dedupe: bool) -> JSONResponse:
+    """Queues a decode job and answers 202 with the job, or 503 when the job queue is full."""
+    try:
+        job = decodeJobs.submit(current_user.id, run_decode_job, contents, path, source, current_user.id, dedupe)
+    except decodeEngine.DecodeQueueFullError as e:
+        raise decoder_busy_exception(e)
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED,
+                        content=qrSchemas.QRDecodeJob(**job).model_dump(mode="json"),
+                        headers={"Location": f"{router.prefix}/jobs/{job['id']}"})
+
+DECODE_JOB_RESPONSES = {status.HTTP_202_ACCEPTED: {"model": qrSchemas.QRDecodeJob,
+                                                   "description": "With `job=true`: the queued decode job"}}
+
+def qr_delete_statement(soft: bool, *criteria):
+    """
+    Returns the statement deleting the qr rows matching criteria: a DELETE, or with soft
+    an UPDATE setting disabled on the rows not already soft deleted.
+    """
+    if soft:
+        return update(qrModel.QR).where(*criteria, qrModel.QR_ACTIVE).values(disabled=True, updated_at=datetime.now())
+    return delete(qrModel.QR).where(*criteria)
+
+def delete_qr_chunks(db, criteria: list, soft: bool, batch_size: int, max_rows: int | None = None) -> int:
+    """
+    Deletes the qr rows matching criteria batch_size rows at a time, each batch in its own
+    short transaction, so no statement holds locks on a large part of the table.
+
+    Returns:
+        The number of rows deleted, at most max_rows when given.
+    """
+    if soft:
+        criteria = [*criteria, qrModel.QR_ACTIVE]
+    deleted = 0
+    while max_rows is None or deleted < max_rows:
+        limit = batch_size if max_rows is None else min(batch_size, max_rows - deleted)
+        ids = db.scalars(select(qrModel.QR.id).where(*criteria).limit(limit)).all()
+        if not ids:
+            break
+        deleted += db.execute(qr_delete_statement(soft, qrModel.QR.id.in_(ids))).rowcount
+        db.commit()
+    return deleted
+
+QR_RENDER_RESPONSES = {status.HTTP_200_OK: {"content": {media_type: {} for media_type in qrRender.MEDIA_TYPES.values()}}}
+
+QR_IMAGE_RESPONSES = {**QR_RENDER_RESPONSES,
+                      status.HTTP_304_NOT_MODIFIED: {"description": "The client's copy, named by If-None-Match, is current"}}
+
+def qr_image_response(request: Request, data: str, params: qrSchemas.QRRenderParams, conditional: bool = True) -> Response:
+    """
+    Renders data as a QR code image, through the render cache.
+
+    The strong ETag is the render key, known without rendering, so a matching
+    If-None-Match is answered with 304 before the image is rendered or read from the cache.
+    Pass conditional=False from non-GET routes, where a 304 is not a valid answer.
+    """
+    key = qrRender.render_key(data, params.format, params.size, params.error_correction, params.border)
+    headers = {"ETag": httpCache.strong_etag(key),
+               "Cache-Control": f"private, max-age={settings.qr_render_max_age_seconds}"}
+    if conditional:
+        not_modified = httpCache.not_modified(request, headers)
+        if not_modified is not None:
+            return not_modified
+    try:
+        rendered = qrRender.render(data, params.format, params.size, params.error_correction, params.border)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Response(rendered.content, media_type=rendered.media_type, headers=headers)
+
+EXPORT_COLUMNS = ['id', 'path', 'data', 'source', 'user_id', 'created_at', 'updated_at']
+
+def format_export_rows(rows, export_format: ExportFormatEnum, include_header: bool = False) -> str:
+    if export_format == ExportFormatEnum.CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if include_header:
+            writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(rows)
+        return buffer.getvalue()
+    return ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + '\n' for row in rows)
+
+def stream_qr_export(query, export_format: ExportFormatEnum, session_factory = database.SessionLocal):
+    """
+    Yields the export one database batch at a time from a server-side cursor.
+
+    The generator owns its session, from session_factory (the primary or a replica):
+    route dependencies are closed before a StreamingResponse body is sent, so the
+    request session cannot be used here.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(query.execution_options(yield_per=settings.qr_export_batch_size))
+        if export_format == ExportFormatEnum.CSV:
+            yield format_export_rows([], export_format, include_header=True)
+        for rows in result.partitions():
+            yield format_export_rows(rows, export_format)
+    finally:
+        db.close()
+
+@router.get('/export')
+def export_qr(response: Response, export_format: Annotated[ExportFormatEnum, Query(alias="format")] = ExportFormatEnum.NDJSON,
+              date_from: datetime | None = None, date_to: datetime | None = None, source: QRSourceEnum | None = None,
+              replica: int | None = Depends(dbRouting.get_read_replica), current_user = get_reader_dependency):
+    query = select(*[getattr(qrModel.QR, column) for column in EXPORT_COLUMNS]).where(qrModel.QR_ACTIVE)
+    if not oauth2.isAdmin(current_user):
+        query = query.where(qrModel.QR.user_id == current_user.id)
+    if date_from is not None:
+        query = query.where(qrModel.QR.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(qrModel.QR.created_at < date_to)
+    if source is not None:
+        query = query.where(qrModel.QR.source == source.value)
+    query = query.order_by(qrModel.QR.created_at, qrModel.QR.id)
+
+    if export_format == ExportFormatEnum.CSV:
+        media_type, extension = 'text/csv', 'csv'
+    else:
+        media_type, extension = 'application/x-ndjson', 'ndjson'
+    exportResponse = StreamingResponse(stream_qr_export(query, export_format, dbRouting.read_sessionmaker(replica)), media_type=media_type,
+                                       headers={"Content-Disposition": f'attachment; filename="qr-export.{extension}"'})
+    return dbRouting.forward_read_from(response, exportResponse)
+
+def lookup_qr_statement(data: str, current_user):
+    statement = select(qrModel.QR).where(qrModel.QR.data_hash == qrModel.data_digest(data),
+                                         qrModel.QR.data == data, qrModel.QR_ACTIVE)
+    if not oauth2.isAdmin(current_user):
+        statement = statement.where(qrModel.QR.user_id == current_user.id)
+    return statement.limit(100)
+
+def qr_not_scanned_exception():
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                         detail=f"QR data was not scanned before")
+
+@router.get('/lookup', response_model=List[qrSchemas.QR])
+def lookup_qr(data: str, db = read_database_dependency, current_user = get_reader_dependency):
+    """Answers "was this payload already scanned?" with an index lookup on data_hash."""
+    qrList = db.scalars(lookup_qr_statement(data, current_user)).all()
+
+    if len(qrList) == 0:
+        raise qr_not_scanned_exception()
+
+    return qrList
+
+def search_qr_statement(dialect: str, q: str, limit: int, offset: int, current_user):
+    statement = qrSearch.search_statement(dialect, q).where(qrModel.QR_ACTIVE)
+    if not oauth2.isAdmin(current_user):
+        statement = statement.where(qrModel.QR.user_id == current_user.id)
+    return statement.offset(offset).limit(limit)
+
+@router.get('/search', response_model=List[qrSchemas.QR])
+def search_qr(q: Annotated[str, Query(min_length=1, max_length=200)], limit: int = Query(20, gt=0, le=100),
+              offset: int = Query(0, ge=0), db = read_database_dependency, current_user = get_reader_dependency):
+    if not q.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Search query is empty")
+    return db.scalars(search_qr_statement(db.get_bind().dialect.name, q, limit, offset, current_user)).all()
+
+@router.get('/render', response_class=Response, responses=QR_IMAGE_RESPONSES)
+def get_rendered_qr(request: Request, qr: Annotated[qrSchemas.QRRenderRequest, Query()], current_user = get_reader_dependency):
+    """Same as POST /qr/render with query parameters, so rendered images can be revalidated."""
+    return qr_image_response(request, qr.data, qr)
+
+@router.get('/jobs/{id}', response_model=qrSchemas.QRDecodeJob)
+def get_decode_job(id: str, current_user = get_reader_dependency):
+    job = decodeJobs.get(id)
+    if job is None or (job["user_id"] != current_user.id and not oauth2.isAdmin(current_user)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Decode job with id: {id} does not exist")
+    return job
+
+@router.get('/{id}', response_model=qrSchemas.QR, responses=httpCache.NOT_MODIFIED_RESPONSES)
+def get_qr(id: str, request: Request, response: Response, db = read_database_dependency, current_user = get_reader_dependency):
     isAdmin = oauth2.isAdmin(current_user)
+    if httpCache.is_conditional(request):
+        # Only updated_at is read, so a poll of an unchanged row loads and serializes nothing
+        versionQuery = db.query(qrModel.QR.updated_at).filter(qrModel.QR.id == id, qrModel.QR_ACTIVE)
+        if not isAdmin:
+            versionQuery = versionQuery.filter(qrModel.QR.user_id == current_user.id)
+        updated_at = versionQuery.scalar()
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"QR with id: {id} does not exist")
+        not_modified = httpCache.not_modified(request, httpCache.row_headers(id, updated_at))
+        if not_modified is not None:
+            return dbRouting.forward_read_from(response, not_modified)
+
     if isAdmin:  
-        qr = db.query(qrModel.QR).filter(qrModel.QR.id == id).first()
+        qr = db.query(qrModel.QR).filter(qrModel.QR.id == id, qrModel.QR_ACTIVE).first()
     else:
-        qr = db.query(qrModel.QR).filter(qrModel.QR.id == id & qrModel.QR.user_id == current_user.id).first()
+        qr = db.query(qrModel.QR).filter(qrModel.QR.id == id, qrModel.QR.user_id == current_user.id, qrModel.QR_ACTIVE).first()
     
     if not qr:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"QR with id: {id} does not exist")
 
+    response.headers.update(httpCache.row_headers(qr.id, qr.updated_at))
     return qr
 
-@router.get('/', response_model= List[qrSchemas.QR])
-def get_qr(filter_query: Annotated[schemas.FilterParams, Query()], db = database_dependency, current_user = get_user_dependency):
+@router.get('/{id}/image', response_class=Response, responses=QR_IMAGE_RESPONSES)
+def get_qr_image(id: str, request: Request, response: Response, params: Annotated[qrSchemas.QRRenderParams, Query()],
+                 db = read_database_dependency, current_user = get_reader_dependency):
+    """Renders the data of a stored QR code as a PNG or SVG image."""
+    qrQuery = db.query(qrModel.QR.data).filter(qrModel.QR.id == id, qrModel.QR_ACTIVE)
+    if not oauth2.isAdmin(current_user):
+        qrQuery = qrQuery.filter(qrModel.QR.user_id == current_user.id)
+    qr = qrQuery.first()
+    if not qr:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"QR with id: {id} does not exist")
+    return dbRouting.forward_read_from(response, qr_image_response(request, qr.data, params))
+
+@router.get('/', response_model= List[qrSchemas.QR], responses=httpCache.NOT_MODIFIED_RESPONSES)
+def get_qr(filter_query: Annotated[schemas.FilterParams, Query()], request: Request, response: Response, db = read_database_dependency, current_user = get_reader_dependency):
     isAdmin = oauth2.isAdmin(current_user)
-    if isAdmin:  
-        qrList = db.query(qrModel.QR).offset(filter_query.offset).limit(filter_query.limit).all()
+    if httpCache.is_conditional(request):
+        # The same page, reading only (id, updated_at), to compare its digest first
+        versionQuery = db.query(qrModel.QR.id, qrModel.QR.updated_at).filter(qrModel.QR_ACTIVE)
+        if not isAdmin:
+            versionQuery = versionQuery.filter(qrModel.QR.user_id == current_user.id)
+        versions = pagination.paginate(versionQuery, qrModel.QR, filter_query).all()
+        if versions:
+            not_modified = httpCache.not_modified(request, httpCache.page_headers(versions))
+            if not_modified is not None:
+                return dbRouting.forward_read_from(response, not_modified)
+
+    if settings.api_fast_serialization:
+        # Plain column rows instead of ORM objects, rendered without model validation
+        qrQuery = db.query(*FAST_QR_COLUMNS)
     else:
-        qrList = db.query(qrModel.QR).offset(filter_query.offset).limit(filter_query.limit).filter(qrModel.QR.user_id == current_user.id).all()
+        qrQuery = db.query(qrModel.QR)
+    qrQuery = qrQuery.filter(qrModel.QR_ACTIVE)
+    if not isAdmin:
+        qrQuery = qrQuery.filter(qrModel.QR.user_id == current_user.id)
+    qrList = pagination.paginate(qrQuery, qrModel.QR, filter_query).all()
         
     if len(qrList) == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"No QR list")
 
+    headers = httpCache.page_headers(qrList)
+    if settings.api_fast_serialization:
+        pageResponse = pagination.fast_page_response(qrList, qrSchemas.QR_FIELDS, filter_query.limit)
+        pageResponse.headers.update(headers)
+        return dbRouting.forward_read_from(response, pageResponse)
+    response.headers.update(headers)
+    pagination.set_next_cursor(response, qrList, filter_query.limit)
     return qrList
 
 @router.post('/', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR)
-def create_qr(qr: qrSchemas.QRBase, db = database_dependency, current_user = get_user_dependency):
-    newQr = qrModel.QR(
-        id=str(uuid.uuid4()),
-        path=qr.path,
-        data=qr.data,
-        created_at= datetime.now(),
-        updated_at=datetime.now(),
-        # user=current_user,
-        user_id=current_user.id,
-        source=QRSourceEnum.DIRECT_VALUE,
-        disabled=False
-    )
-    db.add(newQr)
-    db.commit()
-    return newQr
+def create_qr(qr: qrSchemas.QRBase, response: Response, dedupe: bool = False, db = database_dependency, current_user = get_user_dependency):
+    return save_qr(db, qr.data, qr.path, QRSourceEnum.DIRECT_VALUE, current_user, dedupe, response)
 
-@router.post('/qr-image-data', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR)
-def create_qr_image_data(qr: qrSchemas.QRBase, db = database_dependency, current_user = get_user_dependency):
-    qrData = ''
-    try:
-        qrData = qrUtil.decode_qr_from_base64(qr.data + '==')
-    except Exception as e: 
-        print('error', e)
-    
-    print('qrData', qrData)
+@router.post('/render', response_class=Response, responses=QR_RENDER_RESPONSES)
+def render_qr(request: Request, qr: qrSchemas.QRRenderRequest, current_user = get_reader_dependency):
+    """Renders any data as a PNG or SVG QR code image, without storing it."""
+    # Validators are not evaluated: a POST may not be answered with 304 (RFC 9110 13.1.2);
+    # clients revalidating rendered images use GET /qr/render
+    return qr_image_response(request, qr.data, qr, conditional=False)
+
+@router.post('/qr-image-data', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR, responses=DECODE_JOB_RESPONSES)
+async def create_qr_image_data(qr: qrSchemas.QRBase, response: Response, dedupe: bool = False, job: bool = False, db = database_dependency, current_user = get_user_dependency):
+    # The image routes are async def so waiting on the decode engine holds no request thread;
+    # the sync session is only used through run_in_threadpool
+    contents = await run_in_threadpool(read_base64_image, qr)
+    if job:
+        return await run_in_threadpool(accept_decode_job, contents, qr.path, QRSourceEnum.IMAGE_DATA, current_user, dedupe)
+    qrData = await decode_on_engine(contents)
+    logger.debug("Decoded base64 image", extra={"values": len(qrData)})
     if qrData != '' and len(qrData) > 0:
-        newQr = qrModel.QR(
-            id=str(uuid.uuid4()),
-            path=qr.path,
-            data=qrData,
-            created_at= datetime.now(),
-            updated_at=datetime.now(),
-            user_id=current_user.id,
-            source=QRSourceEnum.IMAGE_DATA,
-            disabled=False
-        )
-        db.add(newQr)
-        db.commit()
-        return newQr
+        return await run_in_threadpool(save_qr, db, qrUtil.join_decoded_values(qrData), qr.path, QRSourceEnum.IMAGE_DATA, current_user, dedupe, response, qrData.backend)
     else:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"QR Data is not valid. Please try encode QR string without header.")
+                        detail=getattr(qrData, 'error', None) or "QR Data is not valid. Please try encode QR string without header.")
         
         
-@router.post('/qr-image-file', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR)
-def create_qr_image_file(file: Annotated[UploadFile, File(description="Only Image file")] = None, db = database_dependency, current_user = get_user_dependency):
-    print('file from url',file)
+@router.post('/qr-image-file', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR, responses=DECODE_JOB_RESPONSES)
+async def create_qr_image_file(response: Response, file: Annotated[UploadFile, File(description="Only Image file")] = None, dedupe: bool = False, job: bool = False, db = database_dependency, current_user = get_user_dependency):
+    logger.debug("Received image file", extra={"upload": file.filename if file else None})
     qrData = ''
-    try:
-        contents = file.file.read()
-        qrData = qrUtil.decode_qr_from_file_content(contents)
-    except Exception as e: 
-        print('error', e)
+    contents = b''
+    if file is not None:
+        contents = await uploads.read_upload_file_async(file)
+    if job and contents:
+        return await run_in_threadpool(accept_decode_job, contents, file.filename, QRSourceEnum.IMAGE_FILE, current_user, dedupe)
+    if contents:
+        qrData = await decode_on_engine(contents)
     
     if qrData != '' and len(qrData) > 0:
-        newQr = qrModel.QR(
-            id=str(uuid.uuid4()),
-            path=file.filename,
-            data=qrData,
-            created_at= datetime.now(),
-            updated_at=datetime.now(),
-            # user=current_user,
-            user_id=current_user.id,
-            source=QRSourceEnum.IMAGE_FILE,
-            disabled=False
-        )
-        db.add(newQr)
-        db.commit()
-        return newQr
+        return await run_in_threadpool(save_qr, db, qrUtil.join_decoded_values(qrData), file.filename, QRSourceEnum.IMAGE_FILE, current_user, dedupe, response, qrData.backend)
     else:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"QR Image is not valid. Please try with other QR.")
+                        detail=getattr(qrData, 'error', None) or "QR Image is not valid. Please try with other QR.")
         
 
+@router.post('/qr-image-raw', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR,
+             openapi_extra={"requestBody": {"required": True, "content": {
+                 "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+                 "image/*": {"schema": {"type": "string", "format": "binary"}}}}}, responses=DECODE_JOB_RESPONSES,
+             # Route dependencies run first: anonymous clients get 401 before the body is checked or read
+             dependencies=[get_user_dependency])
+async def create_qr_image_raw(contents: Annotated[bytes, Depends(uploads.read_raw_image_body)], response: Response, path: str = '', dedupe: bool = False, job: bool = False, db = database_dependency, current_user = get_user_dependency):
+    if job:
+        return await run_in_threadpool(accept_decode_job, contents, path, QRSourceEnum.IMAGE_FILE, current_user, dedupe)
+    qrData = await decode_on_engine(contents)
+
+    if qrData != '' and len(qrData) > 0:
+        return await run_in_threadpool(save_qr, db, qrUtil.join_decoded_values(qrData), path, QRSourceEnum.IMAGE_FILE, current_user, dedupe, response, qrData.backend)
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=getattr(qrData, 'error', None) or "QR Image is not valid. Please try with other QR.")
+
+
+@router.post('/batch', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QRBatchResult)
+def create_qr_batch(files: Annotated[List[UploadFile], File(description="Image files or ZIP archives of image files")], db = database_dependency, current_user = get_user_dependency):
+    # The limits cover the whole batch, loose files and ZIP entries alike, and are checked
+    # while reading so an oversized batch is rejected before the rest of it is read
+    images = []
+    totalBytes = 0
+    for file in files:
+        contents = uploads.read_upload_file(file)
+        if qrUtil.is_zip_archive(file.filename, contents):
+            try:
+                entries = qrUtil.extract_zip_images(contents, settings.qr_batch_max_files - len(images),
+                                                    settings.qr_upload_max_bytes,
+                                                    settings.qr_batch_max_total_bytes - totalBytes)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=f"{file.filename}: {e}")
+        else:
+            entries = [(file.filename, contents)]
+        images.extend(entries)
+        totalBytes += sum(len(data) for _, data in entries)
+        if len(images) > settings.qr_batch_max_files:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Batch holds more than {settings.qr_batch_max_files} images")
+        if totalBytes > settings.qr_batch_max_total_bytes:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Batch holds more than {settings.qr_batch_max_total_bytes} bytes of images")
+
+    # Cache hits skip the pool; a slow or failed image is reported in its own result
+    # instead of failing the batch
+    lookups = [qrUtil.lookup_decoded(contents) for _, contents in images]
+    misses = [index for index, (_, cached) in enumerate(lookups) if cached is None]
+    decodedList = [cached for _, cached in lookups]
+    decodedMisses = decodeEngine.get_engine().map(qrUtil.decode_qr_from_image_bytes,
+                                                  [images[index][1] for index in misses], return_exceptions=True)
+    for index, qrDataList in zip(misses, decodedMisses):
+        if isinstance(qrDataList, qrUtil.DecodedValues):
+            qrUtil.observe_decoded(qrDataList)
+            qrUtil.store_decoded(lookups[index][0], qrDataList)
+        decodedList[index] = qrDataList
+
+    now = datetime.now()
+    rows = []
+    results = []
+    for (filename, _), qrDataList in zip(images, decodedList):
+        if isinstance(qrDataList, DECODER_ERRORS):
+            results.append(qrSchemas.QRBatchItem(filename=filename, success=False,
+                                                 error=decoder_busy_exception(qrDataList).detail))
+            continue
+        if isinstance(qrDataList, Exception):
+            # Reported like any other failed image rather than failing the whole batch
+            logger.error("Batch image decode failed", exc_info=qrDataList, extra={"upload": filename})
+            results.append(qrSchemas.QRBatchItem(filename=filename, success=False,
+                                                 error="QR Image could not be decoded. Please retry."))
+            continue
+        if not qrDataList:
+            results.append(qrSchemas.QRBatchItem(filename=filename, success=False,
+                                                 error=qrDataList.error or "QR Image is not valid. Please try with other QR."))
+            continue
+        # One row per image, holding every code found like the single-image uploads
+        row = new_qr_row(qrUtil.join_decoded_values(qrDataList), filename, QRSourceEnum.IMAGE_FILE,
+                         current_user.id, now, qrDataList.backend)
+        rows.append(row)
+        results.append(qrSchemas.QRBatchItem(filename=filename, success=True,
+                                             qr=[qrSchemas.QR(**row)],
+                                             frames=qrDataList.frames))
+
+    # One executemany insert and one commit for the whole batch
+    if rows:
+        db.execute(insert(qrModel.QR), rows)
+        db.commit()
+
+    succeeded = sum(1 for result in results if result.success)
+    return qrSchemas.QRBatchResult(total=len(results), succeeded=succeeded,
+                                   failed=len(results) - succeeded, results=results)
+
+
+def check_bulk_request(qrList: List[qrSchemas.QRBase]):
+    if len(qrList) == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"No QR given")
+    if len(qrList) > settings.qr_bulk_max_items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Bulk request holds {len(qrList)} QR, the limit is {settings.qr_bulk_max_items}")
+
+def existing_qr_statement(qrList: List[qrSchemas.QRBase], user_id: str):
+    # One indexed query for the whole request instead of one lookup per item
+    hashes = {qrModel.data_digest(qr.data) for qr in qrList}
+    return select(qrModel.QR.id, qrModel.QR.data).where(
+        qrModel.QR.user_id == user_id, qrModel.QR.data_hash.in_(hashes), qrModel.QR_ACTIVE)
+
+def bulk_qr_rows(qrList: List[qrSchemas.QRBase], dedupe: bool, existingRows, user_id: str) -> tuple[list[str], list[dict]]:
+    """Returns the id of every item, existing or new, and the rows to insert for the new ones."""
+    now = datetime.now()
+    existingIds = {}
+    for existingQr in existingRows:
+        existingIds.setdefault(existingQr.data, existingQr.id)
+
+    ids = []
+    rows = []
+    for qr in qrList:
+        if qr.data in existingIds:
+            ids.append(existingIds[qr.data])
+            continue
+        row = new_qr_row(qr.data, qr.path, QRSourceEnum.DIRECT_VALUE, user_id, now)
+        if dedupe:
+            existingIds[qr.data] = row['id']
+        rows.append(row)
+        ids.append(row['id'])
+    return ids, rows
+
+@router.post('/bulk', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QRBulkResult)
+def create_qr_bulk(qrList: List[qrSchemas.QRBase], dedupe: bool = False, db = database_dependency, current_user = get_user_dependency):
+    check_bulk_request(qrList)
+    existingRows = db.execute(existing_qr_statement(qrList, current_user.id)).all() if dedupe else []
+    ids, rows = bulk_qr_rows(qrList, dedupe, existingRows, current_user.id)
+
+    # One executemany insert and one commit instead of an ORM object and a commit per row
+    if rows:
+        db.execute(insert(qrModel.QR), rows)
+        db.commit()
+
+    return qrSchemas.QRBulkResult(created=len(rows), ids=ids)
+
+
+def bulk_delete_filters(criteria: qrSchemas.QRBulkDelete) -> list:
+    filters = []
+    if criteria.ids is not None:
+        if len(criteria.ids) > settings.qr_bulk_max_items:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Bulk request holds {len(criteria.ids)} ids, the limit is {settings.qr_bulk_max_items}")
+        filters.append(qrModel.QR.id.in_(criteria.ids))
+    if criteria.user_id is not None:
+        filters.append(qrModel.QR.user_id == criteria.user_id)
+    if criteria.date_from is not None:
+        filters.append(qrModel.QR.created_at >= criteria.date_from)
+    if criteria.date_to is not None:
+        filters.append(qrModel.QR.created_at < criteria.date_to)
+    if not filters:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Give ids, user_id or a date range")
+    return filters
+
+def remaining_qr_statement(filters: list, soft: bool):
+    if soft:
+        filters = [*filters, qrModel.QR_ACTIVE]
+    return select(qrModel.QR.id).where(*filters).limit(1)
+
+@router.post('/bulk-delete', response_model=qrSchemas.QRBulkDeleteResult)
+def delete_qr_bulk(criteria: qrSchemas.QRBulkDelete, max_rows: int = Query(100000, gt=0),
+                   db = database_dependency, current_user = get_user_dependency):
+    """
+    Deletes the QR codes matching every given criterion, in chunks of QR_DELETE_BATCH_SIZE rows.
+    Call again while `remaining` is true.
+    """
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    filters = bulk_delete_filters(criteria)
+
+    soft = settings.qr_soft_delete
+    deleted = delete_qr_chunks(db, filters, soft, settings.qr_delete_batch_size, max_rows)
+    remaining = False
+    if deleted >= max_rows:
+        remaining = db.execute(remaining_qr_statement(filters, soft)).first() is not None
+    return qrSchemas.QRBulkDeleteResult(deleted=deleted, remaining=remaining, soft=soft)
+
 @router.delete('/{id}', status_code=status.HTTP_200_OK)
 def delete_qr(id: str, db = database_dependency, current_user = get_user_dependency):
     if not oauth2.isAdmin(current_user):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail=f"User is not admin")
-    qrQuery = db.query(qrModel.QR).filter(qrModel.QR.id == id)
-    
-    qr = qrQuery.first()
-    
-    if qr == None:
+    # One statement: its row count tells whether the QR existed
+    result = db.execute(qr_delete_statement(settings.qr_soft_delete, qrModel.QR.id == id))
+
+    if result.rowcount == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"QR with id: {id} does not exist")
-
-    qrQuery.delete(synchronize_session=False)
     db.commit()
-    
+
     return "QR deleted successfully"
 
@@ -0,0 +1,232 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from typing import Annotated, List
+
+from ..utility import oauth2, qrUtil, dbRouting, httpCache, uploads, pagination
+from ..config import database
+from ..schemas import qrSchemas, schemas
+from ..models import qrModel, userModel
+from ..utility.enums import QRSourceEnum
+from .qr import (DECODE_JOB_RESPONSES, FAST_QR_COLUMNS, QR_IMAGE_RESPONSES, accept_decode_job, bulk_delete_filters, bulk_qr_rows,
+                 check_bulk_request, decode_on_engine, existing_qr_statement, lookup_qr_statement, new_qr_row, qr_delete_statement,
+                 qr_image_response, qr_not_scanned_exception, read_base64_image, remaining_qr_statement, search_qr_statement)
+from ..config.config import settings
+
+# Async counterparts of the routes in qr.py, used when DATABASE_MODE=async
+router = APIRouter(
+    prefix="/qr",
+    tags=['QR']
+)
+
+database_dependency = Depends(database.get_async_db)
+
+read_database_dependency = Depends(dbRouting.get_async_read_db)
+
+get_user_dependency: userModel.User = Depends(oauth2.get_current_user_async)
+
+get_reader_dependency: userModel.User = Depends(oauth2.get_current_user_readonly_async)
+
+async def save_decoded_qr(db, data: str, path: str, source: QRSourceEnum, current_user, dedupe: bool, response: Response, decoder: str | None = None):
+    if dedupe:
+        query = select(qrModel.QR).where(qrModel.QR.user_id == current_user.id,
+                                         qrModel.QR.data_hash == qrModel.data_digest(data),
+                                         qrModel.QR.data == data, qrModel.QR_ACTIVE)
+        existingQr = (await db.execute(query)).scalars().first()
+        if existingQr:
+            response.status_code = status.HTTP_200_OK
+            return existingQr
+    newQr = qrModel.QR(**new_qr_row(data, path, source, current_user.id, datetime.now(), decoder))
+    db.add(newQr)
+    await db.commit()
+    return newQr
+
+async def delete_qr_chunks(db, criteria: list, soft: bool, batch_size: int, max_rows: int | None = None) -> int:
+    """Async counterpart of qr.delete_qr_chunks."""
+    if soft:
+        criteria = [*criteria, qrModel.QR_ACTIVE]
+    deleted = 0
+    while max_rows is None or deleted < max_rows:
+        limit = batch_size if max_rows is None else min(batch_size, max_rows - deleted)
+        ids = (await db.scalars(select(qrModel.QR.id).where(*criteria).limit(limit))).all()
+        if not ids:
+            break
+        deleted += (await db.execute(qr_delete_statement(soft, qrModel.QR.id.in_(ids)))).rowcount
+        await db.commit()
+    return deleted
+
+@router.get('/lookup', response_model=List[qrSchemas.QR])
+async def lookup_qr(data: str, db = read_database_dependency, current_user = get_reader_dependency):
+    qrList = (await db.scalars(lookup_qr_statement(data, current_user))).all()
+
+    if len(qrList) == 0:
+        raise qr_not_scanned_exception()
+
+    return qrList
+
+@router.get('/search', response_model=List[qrSchemas.QR])
+async def search_qr(q: Annotated[str, Query(min_length=1, max_length=200)], limit: int = Query(20, gt=0, le=100),
+                    offset: int = Query(0, ge=0), db = read_database_dependency, current_user = get_reader_dependency):
+    if not q.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Search query is empty")
+    return (await db.scalars(search_qr_statement(db.get_bind().dialect.name, q, limit, offset, current_user))).all()
+
+@router.get('/{id}', response_model=qrSchemas.QR, responses=httpCache.NOT_MODIFIED_RESPONSES)
+async def get_qr(id: str, request: Request, response: Response, db = read_database_dependency, current_user = get_reader_dependency):
+    isAdmin = oauth2.isAdmin(current_user)
+    if httpCache.is_conditional(request):
+        versionQuery = select(qrModel.QR.updated_at).where(qrModel.QR.id == id, qrModel.QR_ACTIVE)
+        if not isAdmin:
+            versionQuery = versionQuery.where(qrModel.QR.user_id == current_user.id)
+        updated_at = (await db.execute(versionQuery)).scalar()
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"QR with id: {id} does not exist")
+        not_modified = httpCache.not_modified(request, httpCache.row_headers(id, updated_at))
+        if not_modified is not None:
+            return dbRouting.forward_read_from(response, not_modified)
+
+    query = select(qrModel.QR).where(qrModel.QR.id == id, qrModel.QR_ACTIVE)
+    if not isAdmin:
+        query = query.where(qrModel.QR.user_id == current_user.id)
+    qr = (await db.execute(query)).scalars().first()
+
+    if not qr:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"QR with id: {id} does not exist")
+
+    response.headers.update(httpCache.row_headers(qr.id, qr.updated_at))
+    return qr
+
+@router.get('/{id}/image', response_class=Response, responses=QR_IMAGE_RESPONSES)
+async def get_qr_image(id: str, request: Request, response: Response, params: Annotated[qrSchemas.QRRenderParams, Query()],
+                       db = read_database_dependency, current_user = get_reader_dependency):
+    query = select(qrModel.QR.data).where(qrModel.QR.id == id, qrModel.QR_ACTIVE)
+    if not oauth2.isAdmin(current_user):
+        query = query.where(qrModel.QR.user_id == current_user.id)
+    data = (await db.execute(query)).scalar()
+    if data is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"QR with id: {id} does not exist")
+    # Rendering is CPU bound, so a cache miss must not block the event loop
+    return dbRouting.forward_read_from(response, await run_in_threadpool(qr_image_response, request, data, params))
+
+@router.get('/', response_model= List[qrSchemas.QR], responses=httpCache.NOT_MODIFIED_RESPONSES)
+async def get_qr_list(filter_query: Annotated[schemas.FilterParams, Query()], request: Request, response: Response, db = read_database_dependency, current_user = get_reader_dependency):
+    isAdmin = oauth2.isAdmin(current_user)
+    if httpCache.is_conditional(request):
+        versionQuery = select(qrModel.QR.id, qrModel.QR.updated_at).where(qrModel.QR_ACTIVE)
+        if not isAdmin:
+            versionQuery = versionQuery.where(qrModel.QR.user_id == current_user.id)
+        versions = (await db.execute(pagination.paginate(versionQuery, qrModel.QR, filter_query))).all()
+        if versions:
+            not_modified = httpCache.not_modified(request, httpCache.page_headers(versions))
+            if not_modified is not None:
+                return dbRouting.forward_read_from(response, not_modified)
+
+    query = select(*FAST_QR_COLUMNS) if settings.api_fast_serialization else select(qrModel.QR)
+    query = query.where(qrModel.QR_ACTIVE)
+    if not isAdmin:
+        query = query.where(qrModel.QR.user_id == current_user.id)
+    result = await db.execute(pagination.paginate(query, qrModel.QR, filter_query))
+    qrList = result.all() if settings.api_fast_serialization else result.scalars().all()
+
+    if len(qrList) == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"No QR list")
+
+    headers = httpCache.page_headers(qrList)
+    if settings.api_fast_serialization:
+        pageResponse = pagination.fast_page_response(qrList, qrSchemas.QR_FIELDS, filter_query.limit)
+        pageResponse.headers.update(headers)
+        return dbRouting.forward_read_from(response, pageResponse)
+    response.headers.update(headers)
+    pagination.set_next_cursor(response, qrList, filter_query.limit)
+    return qrList
+
+@router.post('/', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR)
+async def create_qr(qr: qrSchemas.QRBase, response: Response, dedupe: bool = False, db = database_dependency, current_user = get_user_dependency):
+    return await save_decoded_qr(db, qr.data, qr.path, QRSourceEnum.DIRECT_VALUE, current_user, dedupe, response)
+
+@router.post('/qr-image-data', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR, responses=DECODE_JOB_RESPONSES)
+async def create_qr_image_data(qr: qrSchemas.QRBase, response: Response, dedupe: bool = False, job: bool = False, db = database_dependency, current_user = get_user_dependency):
+    contents = await run_in_threadpool(read_base64_image, qr)
+    if job:
+        return await run_in_threadpool(accept_decode_job, contents, qr.path, QRSourceEnum.IMAGE_DATA, current_user, dedupe)
+    qrData = await decode_on_engine(contents)
+    if not qrData:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=getattr(qrData, 'error', None) or "QR Data is not valid. Please try encode QR string without header.")
+    return await save_decoded_qr(db, qrUtil.join_decoded_values(qrData), qr.path, QRSourceEnum.IMAGE_DATA, current_user, dedupe, response, qrData.backend)
+
+@router.post('/qr-image-file', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR, responses=DECODE_JOB_RESPONSES)
+async def create_qr_image_file(response: Response, file: Annotated[UploadFile, File(description="Only Image file")] = None, dedupe: bool = False, job: bool = False, db = database_dependency, current_user = get_user_dependency):
+    qrData = []
+    if file is not None:
+        contents = await uploads.read_upload_file_async(file)
+        if contents and job:
+            return await run_in_threadpool(accept_decode_job, contents, file.filename, QRSourceEnum.IMAGE_FILE, current_user, dedupe)
+        if contents:
+            qrData = await decode_on_engine(contents)
+    if not qrData:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=getattr(qrData, 'error', None) or "QR Image is not valid. Please try with other QR.")
+    return await save_decoded_qr(db, qrUtil.join_decoded_values(qrData), file.filename, QRSourceEnum.IMAGE_FILE, current_user, dedupe, response, qrData.backend)
+
+@router.post('/qr-image-raw', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QR,
+             openapi_extra={"requestBody": {"required": True, "content": {
+                 "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+                 "image/*": {"schema": {"type": "string", "format": "binary"}}}}}, responses=DECODE_JOB_RESPONSES,
+             # Route dependencies run first: anonymous clients get 401 before the body is checked or read
+             dependencies=[get_user_dependency])
+async def create_qr_image_raw(contents: Annotated[bytes, Depends(uploads.read_raw_image_body)], response: Response, path: str = '', dedupe: bool = False, job: bool = False, db = database_dependency, current_user = get_user_dependency):
+    if job:
+        return await run_in_threadpool(accept_decode_job, contents, path, QRSourceEnum.IMAGE_FILE, current_user, dedupe)
+    qrData = await decode_on_engine(contents)
+    if not qrData:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=getattr(qrData, 'error', None) or "QR Image is not valid. Please try with other QR.")
+    return await save_decoded_qr(db, qrUtil.join_decoded_values(qrData), path, QRSourceEnum.IMAGE_FILE, current_user, dedupe, response, qrData.backend)
+
+@router.post('/bulk', status_code=status.HTTP_201_CREATED, response_model=qrSchemas.QRBulkResult)
+async def create_qr_bulk(qrList: List[qrSchemas.QRBase], dedupe: bool = False, db = database_dependency, current_user = get_user_dependency):
+    check_bulk_request(qrList)
+    existingRows = (await db.execute(existing_qr_statement(qrList, current_user.id))).all() if dedupe else []
+    ids, rows = bulk_qr_rows(qrList, dedupe, existingRows, current_user.id)
+
+    if rows:
+        await db.execute(insert(qrModel.QR), rows)
+        await db.commit()
+
+    return qrSchemas.QRBulkResult(created=len(rows), ids=ids)
+
+@router.post('/bulk-delete', response_model=qrSchemas.QRBulkDeleteResult)
+async def delete_qr_bulk(criteria: qrSchemas.QRBulkDelete, max_rows: int = Query(100000, gt=0),
+                         db = database_dependency, current_user = get_user_dependency):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    filters = bulk_delete_filters(criteria)
+
+    soft = settings.qr_soft_delete
+    deleted = await delete_qr_chunks(db, filters, soft, settings.qr_delete_batch_size, max_rows)
+    remaining = False
+    if deleted >= max_rows:
+        remaining = (await db.execute(remaining_qr_statement(filters, soft))).first() is not None
+    return qrSchemas.QRBulkDeleteResult(deleted=deleted, remaining=remaining, soft=soft)
+
+@router.delete('/{id}', status_code=status.HTTP_200_OK)
+async def delete_qr(id: str, db = database_dependency, current_user = get_user_dependency):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    result = await db.execute(qr_delete_statement(settings.qr_soft_delete, qrModel.QR.id == id))
+
+    if result.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"QR with id: {id} does not exist")
+    await db.commit()
+
+    return "QR deleted successfully"
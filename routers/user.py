@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException, Query
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 from typing import Annotated, List
 
-from ..utility import oauth2
+from ..utility import oauth2, dbRouting, httpCache, pagination
 from ..config import database
 from ..schemas import userSchemas, schemas
-from ..models import userModel
+from ..models import qrModel, userModel
+from ..config.config import settings
+from .qr import delete_qr_chunks
 
 router = APIRouter(
     prefix="/users",
@@ -14,49 +18,94 @@ router = APIRouter(
 
 database_dependency: Session = Depends(database.get_db)
 
+read_database_dependency: Session = Depends(dbRouting.get_read_db)
+
 get_user_dependency: userModel.User = Depends(oauth2.get_current_user)
 
-@router.get('/{id}', response_model=userSchemas.User)
-def get_user(id: str, db = database_dependency, current_user = get_user_dependency):
+FAST_USER_COLUMNS = [getattr(userModel.User, field) for field in userSchemas.USER_FIELDS] + [userModel.User.created_at]
+
+get_reader_dependency: userModel.User = Depends(oauth2.get_current_user_readonly)
+
+@router.get('/{id}', response_model=userSchemas.User, responses=httpCache.NOT_MODIFIED_RESPONSES)
+def get_user(id: str, request: Request, response: Response, db = read_database_dependency, current_user = get_reader_dependency):
     if not oauth2.isAdmin(current_user):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail=f"User is not admin")
+    if httpCache.is_conditional(request):
+        # Only updated_at is read, so a poll of an unchanged user loads and serializes nothing
+        updated_at = db.query(userModel.User.updated_at).filter(userModel.User.id == id).scalar()
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"User with id: {id} does not exist")
+        not_modified = httpCache.not_modified(request, httpCache.row_headers(id, updated_at))
+        if not_modified is not None:
+            return dbRouting.forward_read_from(response, not_modified)
+
     user = db.query(userModel.User).filter(userModel.User.id == id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"User with id: {id} does not exist")
 
+    response.headers.update(httpCache.row_headers(user.id, user.updated_at))
     return user
 
 
 
 @router.get('/', response_model= List[userSchemas.User])
-def get_user(filter_query: Annotated[schemas.FilterParams, Query()], db = database_dependency, current_user = get_user_dependency):
+def get_user(filter_query: Annotated[schemas.FilterParams, Query()], response: Response, db = read_database_dependency, current_user = get_reader_dependency):
     if not oauth2.isAdmin(current_user):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail=f"User is not admin")
-    userList = db.query(userModel.User).offset(filter_query.offset).limit(filter_query.limit).all()
+    userQuery = db.query(*FAST_USER_COLUMNS) if settings.api_fast_serialization else db.query(userModel.User)
+    userList = pagination.paginate(userQuery, userModel.User, filter_query).all()
     if len(userList) == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"No user list")
 
+    if settings.api_fast_serialization:
+        return dbRouting.forward_read_from(response, pagination.fast_page_response(userList, userSchemas.USER_FIELDS, filter_query.limit))
+    pagination.set_next_cursor(response, userList, filter_query.limit)
     return userList
 
+def user_delete_statement(soft: bool, id: str):
+    if soft:
+        return update(userModel.User).where(userModel.User.id == id).values(disabled=True, updated_at=datetime.now())
+    return delete(userModel.User).where(userModel.User.id == id)
+
 @router.delete('/{id}', status_code=status.HTTP_200_OK)
 def delete_user(id: str,db = database_dependency, current_user = get_user_dependency):
     if not oauth2.isAdmin(current_user):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail=f"User is not admin")
-    userQuery = db.query(userModel.User).filter(userModel.User.id == id)
-    
-    user = userQuery.first()
+    soft = settings.qr_soft_delete
+    # The QR codes go first, in short chunked transactions, instead of one ON DELETE
+    # CASCADE transaction locking every row of a heavy user
+    delete_qr_chunks(db, [qrModel.QR.user_id == id], soft, settings.qr_delete_batch_size)
+    # A soft deleted user is disabled, so it can no longer authenticate
+    result = db.execute(user_delete_statement(soft, id))
+
+    if result.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"user with id: {id} does not exist")
+    db.commit()
+    oauth2.invalidate_user(id)
     
+    return "User deleted successfully"
+
+@router.patch('/{id}/disabled', response_model=userSchemas.User)
+def set_user_disabled(id: str, userDisableObject: userSchemas.UserDisable, db = database_dependency, current_user = get_user_dependency):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    user = db.query(userModel.User).filter(userModel.User.id == id).first()
     if user == None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"user with id: {id} does not exist")
 
-    userQuery.delete(synchronize_session=False)
+    user.disabled = userDisableObject.disabled
+    user.updated_at = datetime.now()
     db.commit()
-    
-    return "User deleted successfully"
+    oauth2.invalidate_user(id)
+
+    return user
 
@@ -0,0 +1,99 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException, Query
+from sqlalchemy import select
+from typing import Annotated, List
+
+from ..utility import oauth2, dbRouting, httpCache, pagination
+from ..config import database
+from ..schemas import userSchemas, schemas
+from ..models import qrModel, userModel
+from ..config.config import settings
+from .qrAsync import delete_qr_chunks
+from .user import FAST_USER_COLUMNS, user_delete_statement
+
+# Async counterparts of the routes in user.py, used when DATABASE_MODE=async
+router = APIRouter(
+    prefix="/users",
+    tags=['Users']
+)
+
+database_dependency = Depends(database.get_async_db)
+
+read_database_dependency = Depends(dbRouting.get_async_read_db)
+
+get_user_dependency: userModel.User = Depends(oauth2.get_current_user_async)
+
+get_reader_dependency: userModel.User = Depends(oauth2.get_current_user_readonly_async)
+
+@router.get('/{id}', response_model=userSchemas.User, responses=httpCache.NOT_MODIFIED_RESPONSES)
+async def get_user(id: str, request: Request, response: Response, db = read_database_dependency, current_user = get_reader_dependency):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    if httpCache.is_conditional(request):
+        updated_at = (await db.execute(select(userModel.User.updated_at).where(userModel.User.id == id))).scalar()
+        if updated_at is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=f"User with id: {id} does not exist")
+        not_modified = httpCache.not_modified(request, httpCache.row_headers(id, updated_at))
+        if not_modified is not None:
+            return dbRouting.forward_read_from(response, not_modified)
+
+    user = (await db.execute(select(userModel.User).where(userModel.User.id == id))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"User with id: {id} does not exist")
+
+    response.headers.update(httpCache.row_headers(user.id, user.updated_at))
+    return user
+
+@router.get('/', response_model= List[userSchemas.User])
+async def get_user_list(filter_query: Annotated[schemas.FilterParams, Query()], response: Response, db = read_database_dependency, current_user = get_reader_dependency):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    query = select(*FAST_USER_COLUMNS) if settings.api_fast_serialization else select(userModel.User)
+    result = await db.execute(pagination.paginate(query, userModel.User, filter_query))
+    userList = result.all() if settings.api_fast_serialization else result.scalars().all()
+    if len(userList) == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"No user list")
+
+    if settings.api_fast_serialization:
+        return dbRouting.forward_read_from(response, pagination.fast_page_response(userList, userSchemas.USER_FIELDS, filter_query.limit))
+    pagination.set_next_cursor(response, userList, filter_query.limit)
+    return userList
+
+@router.delete('/{id}', status_code=status.HTTP_200_OK)
+async def delete_user(id: str, db = database_dependency, current_user = get_user_dependency):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    soft = settings.qr_soft_delete
+    await delete_qr_chunks(db, [qrModel.QR.user_id == id], soft, settings.qr_delete_batch_size)
+    result = await db.execute(user_delete_statement(soft, id))
+
+    if result.rowcount == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"user with id: {id} does not exist")
+    await db.commit()
+    oauth2.invalidate_user(id)
+
+    return "User deleted successfully"
+
+@router.patch('/{id}/disabled', response_model=userSchemas.User)
+async def set_user_disabled(id: str, userDisableObject: userSchemas.UserDisable, db = database_dependency, current_user = get_user_dependency):
+    if not oauth2.isAdmin(current_user):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail=f"User is not admin")
+    user = (await db.execute(select(userModel.User).where(userModel.User.id == id))).scalars().first()
+    if user == None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"user with id: {id} does not exist")
+
+    user.disabled = userDisableObject.disabled
+    user.updated_at = datetime.now()
+    await db.commit()
+    oauth2.invalidate_user(id)
+
+    return user
@@ -1,5 +1,10 @@
 # models.py
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
+
+from ..utility.enums import DecodeJobStatusEnum, QRErrorCorrectionEnum, QRImageFormatEnum
+
 class QRBase(BaseModel):
     data : str
     path: str
@@ -11,6 +16,63 @@ class QRCreate(QRBase):
 class QR(QRBase):
     id : str
     user_id  : str
+    decoder: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Columns selected by the fast serialization path of list endpoints, in QR field order
+QR_FIELDS = list(QR.model_fields)
+
+class QRBulkResult(BaseModel):
+    created: int
+    # One id per item, in request order; with dedupe, the id of the existing row
+    ids: List[str]
+
+class QRBulkDelete(BaseModel):
+    # Criteria are combined with AND; at least one is required
+    ids: Optional[List[str]] = None
+    user_id: Optional[str] = None
+    # On created_at, like GET /qr/export: date_from inclusive, date_to exclusive
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+class QRBulkDeleteResult(BaseModel):
+    deleted: int
+    # Whether matching rows are left because max_rows was reached
+    remaining: bool
+    soft: bool
+
+class QRBatchItem(BaseModel):
+    filename: str
+    success: bool
+    qr: List[QR] = []
+    # Frame or PDF page index of each code joined into the data of qr, for multi-frame images
+    frames: List[int] = []
+    error: Optional[str] = None
+
+class QRBatchResult(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[QRBatchItem]
+
+class QRDecodeJob(BaseModel):
+    id: str
+    status: DecodeJobStatusEnum
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    # The stored QR once the job succeeded
+    qr: Optional[QR] = None
+    error: Optional[str] = None
+
+class QRRenderParams(BaseModel):
+    format: QRImageFormatEnum = QRImageFormatEnum.PNG
+    # Width and height in pixels; the upper limit is QR_RENDER_MAX_SIZE
+    size: int = Field(512, gt=0)
+    error_correction: QRErrorCorrectionEnum = QRErrorCorrectionEnum.M
+    # Quiet zone around the code, in modules
+    border: int = Field(4, ge=0, le=20)
+
+class QRRenderRequest(QRRenderParams):
+    data: str = Field(min_length=1)
@@ -5,6 +5,10 @@ from pydantic import BaseModel, Field
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     name: str | None = None
@@ -14,5 +18,7 @@ class TokenData(BaseModel):
 class FilterParams(BaseModel):
     limit: int = Field(100, gt=0, le=100)
     offset: int = Field(0, ge=0)
+    # Opaque keyset cursor from the X-Next-Cursor header of the previous page; replaces offset
+    cursor: str | None = None
     # order_by: Literal["created_at", "updated_at"] = "created_at"
     # tags: list[str] = []
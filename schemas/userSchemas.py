@@ -13,6 +13,20 @@ class UserBase(BaseModel):
 class User(UserBase):
     disabled: Optional[bool] = None
 
+# Columns selected by the fast serialization path of list endpoints, in User field order
+USER_FIELDS = list(User.model_fields)
+
+class UserPrincipal(BaseModel):
+    """The authenticated user as seen by the routes, detached from any DB session."""
+    id: str
+    name: str
+    email: Optional[str] = None
+    role: UserRoleEnum
+    disabled: bool = False
+
+    class Config:
+        from_attributes = True
+
 class UserInDB(User):
     password: str
     
@@ -24,3 +38,6 @@ class UserCreate(BaseModel):
 class UserLoginObject(BaseModel): 
     email: str
     password: str
+
+class UserDisable(BaseModel):
+    disabled: bool
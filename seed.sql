@@ -10,6 +10,7 @@ CREATE TABLE `users` (
   `created_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
   `updated_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
   PRIMARY KEY (`id`),
+  KEY `ix_users_created_id` (`created_at`, `id`),
   UNIQUE KEY `IDX_97672ac88
   
   f789774dd47f7c8be` (`email`)
@@ -24,12 +25,18 @@ CREATE TABLE `qr` (
   `id` varchar(36) NOT NULL,
   `path` text NOT NULL,
   `data` text NOT NULL,
+  `data_hash` char(64) DEFAULT NULL,
   `source` varchar(100) NOT NULL,
+  `decoder` varchar(16) DEFAULT NULL,
   `disabled` boolean NOT NULL DEFAULT FALSE,
   `created_at` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
   `updated_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
   `user_id` varchar(36) NOT NULL,
   key `fk_qr_user` (`user_id`),
+  KEY `ix_qr_user_disabled_created_id` (`user_id`, `disabled`, `created_at`, `id`),
+  KEY `ix_qr_disabled_created_id` (`disabled`, `created_at`, `id`),
+  KEY `ix_qr_user_data_hash` (`user_id`, `data_hash`),
+  FULLTEXT KEY `ft_qr_data_path` (`data`, `path`),
   CONSTRAINT `fk_qr_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
   PRIMARY KEY (`id`)
  
@@ -37,3 +44,19 @@ CREATE TABLE `qr` (
 
 INSERT INTO qr_app_db.qr (id,`path`,`data`,disabled,created_at,updated_at,user_id) VALUES
 	 ('e079fd81-5b33-4f87-9504-474fb6e1471b','PATH','DATA',0,'2025-04-16 16:18:08.546739','2025-04-16 16:49:26.361552','e070fd81-5b33-4f87-9504-474fb6e1471b');
+
+
+CREATE TABLE `refresh_tokens` (
+  `id` varchar(36) NOT NULL,
+  `family_id` varchar(36) NOT NULL,
+  `token_hash` varchar(64) NOT NULL,
+  `user_id` varchar(36) NOT NULL,
+  `expires_at` datetime NOT NULL,
+  `revoked` boolean NOT NULL DEFAULT FALSE,
+  `replaced_by` varchar(36) DEFAULT NULL,
+  `created_at` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+  PRIMARY KEY (`id`),
+  KEY `ix_refresh_tokens_family_id` (`family_id`),
+  KEY `ix_refresh_tokens_user_id` (`user_id`),
+  CONSTRAINT `fk_refresh_tokens_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
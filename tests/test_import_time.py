@@ -0,0 +1,25 @@
+"""
+The import-time budget of the application, checked as `benchmarks/import_time.py` does:
+`main` is imported in fresh interpreters, which need the settings of `.env` (or the environment).
+"""
+import pytest
+
+from ..benchmarks import import_time
+
+RUNS = 3
+
+
+@pytest.fixture(scope="module")
+def measured():
+    return import_time.check_import(RUNS)
+
+
+def test_import_time_within_budget(measured):
+    timings, _ = measured
+    assert timings[0] <= import_time.DEFAULT_BUDGET_MS, (
+        f"best of {RUNS} imports took {timings[0]:.1f} ms, the budget is {import_time.DEFAULT_BUDGET_MS} ms")
+
+
+def test_no_eager_imports(measured):
+    _, eager = measured
+    assert eager == [], f"imported eagerly by main: {', '.join(eager)}"
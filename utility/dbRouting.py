@@ -0,0 +1,97 @@
+from typing import Annotated, Literal
+
+from fastapi import Depends, Header, Query, Request, Response
+from fastapi.exception_handlers import http_exception_handler
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from ..config import database
+from . import oauth2
+
+ReadFrom = Literal["primary", "replica"]
+
+READ_FROM_HEADER = Header(description="Per-request override of read routing: primary or replica")
+READ_FROM_QUERY = Query(description="Same as the X-Read-From header")
+
+
+def choose_replica(user_id: str, read_from: ReadFrom | None) -> int | None:
+    """
+    Returns the index of the replica a read should use, or None for the primary.
+
+    Reads go to the primary when no replica is configured or healthy, when asked to, and,
+    unless a replica is asked for explicitly, when the user wrote within the
+    read-your-writes window.
+    """
+    if not database.REPLICA_URLS or read_from == "primary":
+        return None
+    if read_from != "replica" and database.wrote_recently(user_id):
+        return None
+    return database.replicas.pick()
+
+
+def _record(request: Request, response: Response, replica: int | None) -> int | None:
+    # Also kept on the request, for the error responses built by read_from_exception_handler
+    request.state.read_from = "primary" if replica is None else f"replica-{replica}"
+    response.headers["X-Read-From"] = request.state.read_from
+    return replica
+
+
+def forward_read_from(response: Response, target: Response) -> Response:
+    """
+    Copies X-Read-From from the request's dependency response onto a Response the route
+    returns itself, which FastAPI sends without merging the dependency's headers.
+    """
+    if "X-Read-From" in response.headers:
+        target.headers["X-Read-From"] = response.headers["X-Read-From"]
+    return target
+
+
+async def read_from_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
+    """
+    FastAPI's HTTPException handler, adding X-Read-From to the errors of routes that read
+    through get_read_replica, e.g. a 404 for a row the replica does not have yet.
+    """
+    response = await http_exception_handler(request, exc)
+    read_from = getattr(request.state, "read_from", None)
+    if read_from is not None:
+        response.headers["X-Read-From"] = read_from
+    return response
+
+
+def get_read_replica(request: Request, response: Response, x_read_from: Annotated[ReadFrom | None, READ_FROM_HEADER] = None,
+                     read_from: Annotated[ReadFrom | None, READ_FROM_QUERY] = None,
+                     current_user = Depends(oauth2.get_current_user_readonly)) -> int | None:
+    return _record(request, response, choose_replica(current_user.id, read_from or x_read_from))
+
+
+async def get_read_replica_async(request: Request, response: Response, x_read_from: Annotated[ReadFrom | None, READ_FROM_HEADER] = None,
+                                 read_from: Annotated[ReadFrom | None, READ_FROM_QUERY] = None,
+                                 current_user = Depends(oauth2.get_current_user_readonly_async)) -> int | None:
+    return _record(request, response, choose_replica(current_user.id, read_from or x_read_from))
+
+
+def read_sessionmaker(replica: int | None):
+    return database.SessionLocal if replica is None else database.ReplicaSessionLocals[replica]
+
+
+def get_read_db(replica: int | None = Depends(get_read_replica), db: Session = Depends(database.get_db)):
+    """
+    Session dependency of read-only routes: a replica session, or the request's primary
+    session (the one authentication used) when the read stays on the primary.
+    """
+    if replica is None:
+        yield db
+        return
+    replica_db = database.ReplicaSessionLocals[replica]()
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
+
+
+async def get_async_read_db(replica: int | None = Depends(get_read_replica_async), db = Depends(database.get_async_db)):
+    if replica is None:
+        yield db
+        return
+    async with database.get_async_replica_sessionmakers()[replica]() as replica_db:
+        yield replica_db
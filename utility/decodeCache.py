@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from ..config.config import settings
+from .lruCache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(contents: bytes) -> str:
+    """Returns the cache key of an image: the SHA-256 hex digest of its raw bytes."""
+    return hashlib.sha256(contents).hexdigest()
+
+
+class SQLiteDecodeStore:
+    """
+    A decode result store in a SQLite file, shared by every uvicorn worker on the host.
+
+    Each call opens its own short lived connection, so the store is safe to use
+    from the request threadpool and from decode worker processes alike.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS decode_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=1.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> dict | list | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM decode_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, values: dict):
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO decode_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(values), expires_at),
+            )
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM decode_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+
+
+class DecodeCache:
+    """
+    Caches decoded QR values by image content hash.
+
+    Lookups try the in-process LRU first, then the optional shared SQLite tier.
+    Entries found in the shared tier are promoted into the LRU.
+    """
+
+    def __init__(self, memory: TTLCache, shared: SQLiteDecodeStore | None = None):
+        self.memory = memory
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_errors = 0
+
+    def get(self, key: str) -> dict | list | None:
+        values = self.memory.get(key)
+        if values is not None or self.shared is None:
+            return values
+        try:
+            values = self.shared.get(key)
+        except sqlite3.Error as e:
+            logger.warning("Decode cache shared tier read failed", extra={"error": str(e)})
+            with self._lock:
+                self.shared_errors += 1
+            return None
+        if values is not None:
+            with self._lock:
+                self.shared_hits += 1
+            self.memory.set(key, values)
+        return values
+
+    def set(self, key: str, values: dict):
+        self.memory.set(key, values)
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(key, values)
+        except sqlite3.Error as e:
+            logger.warning("Decode cache shared tier write failed", extra={"error": str(e)})
+            with self._lock:
+                self.shared_errors += 1
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        with self._lock:
+            shared_hits = self.shared_hits
+            shared_errors = self.shared_errors
+        return {
+            # A memory miss served by the shared tier counts as a hit overall
+            "hits": memory["hits"] + shared_hits,
+            "misses": memory["misses"] - shared_hits,
+            "memory": memory,
+            "shared": {
+                "enabled": self.shared is not None,
+                "path": self.shared.path if self.shared else None,
+                "hits": shared_hits,
+                "errors": shared_errors,
+            },
+        }
+
+
+_cache: DecodeCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DecodeCache | None:
+    """Returns the process wide decode cache, or None when it is disabled in Settings."""
+    global _cache
+    if not settings.decode_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                shared = None
+                if settings.decode_cache_sqlite_path:
+                    shared = SQLiteDecodeStore(settings.decode_cache_sqlite_path,
+                                               settings.decode_cache_ttl_seconds)
+                _cache = DecodeCache(
+                    TTLCache(settings.decode_cache_max_entries, settings.decode_cache_ttl_seconds),
+                    shared,
+                )
+    return _cache
@@ -0,0 +1,226 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from ..config.config import settings
+
+
+class DecodeQueueFullError(Exception):
+    """Raised when the decode queue has no free slot for a new job."""
+
+
+class DecodeTimeoutError(Exception):
+    """Raised when a decode job does not finish within the job timeout."""
+
+
+def _timed_call(fn, submitted_at: float, *args):
+    # Runs inside the worker, so the start time is taken when the job leaves the queue
+    started_at = time.time()
+    return fn(*args), started_at - submitted_at
+
+
+class DecodeEngine:
+    """
+    A dedicated worker pool for image decoding, kept apart from the request threadpool.
+
+    At most `workers + queue_size` jobs are accepted at a time. Further submissions
+    fail fast with DecodeQueueFullError instead of queuing without limit.
+    """
+
+    def __init__(self, workers: int, queue_size: int, job_timeout: float, kind: str = "thread"):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.job_timeout = job_timeout
+        self.kind = kind
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qr-decode")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def submit(self, fn, *args, block: bool = False) -> Future:
+        """
+        Queues fn(*args) on the pool.
+
+        Args:
+            fn: A module level function (it must be picklable for the process pool).
+            block: Wait up to the job timeout for a free slot instead of failing at once.
+
+        Returns:
+            A future resolving to the return value of fn.
+
+        Raises:
+            DecodeQueueFullError: If no slot frees up.
+        """
+        acquired = self._slots.acquire(timeout=self.job_timeout) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise DecodeQueueFullError(f"Decode queue is full ({self.workers + self.queue_size} jobs)")
+
+        with self._lock:
+            self._pending += 1
+            self._submitted += 1
+
+        result = Future()
+        try:
+            inner = self._executor.submit(_timed_call, fn, time.time(), *args)
+        except Exception:
+            self._release()
+            raise
+        inner.add_done_callback(lambda done: self._finish(done, result))
+        return result
+
+    def run(self, fn, *args):
+        """
+        Runs fn(*args) on the pool and waits for the result.
+
+        Raises:
+            DecodeQueueFullError: If the queue is full.
+            DecodeTimeoutError: If the job takes longer than the job timeout.
+        """
+        return self.wait(self.submit(fn, *args))
+
+    async def run_async(self, fn, *args):
+        """
+        Same as run(), but awaits the result instead of blocking a thread.
+
+        Raises:
+            DecodeQueueFullError: If the queue is full.
+            DecodeTimeoutError: If the job takes longer than the job timeout.
+        """
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.job_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            future.cancel()
+            raise DecodeTimeoutError(f"Decode job did not finish within {self.job_timeout} seconds")
+
+    def wait(self, future: Future):
+        try:
+            return future.result(timeout=self.job_timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            future.cancel()
+            raise DecodeTimeoutError(f"Decode job did not finish within {self.job_timeout} seconds")
+
+    def map(self, fn, items: list, return_exceptions: bool = False) -> list:
+        """
+        Runs fn over every item, keeping at most `workers` jobs of this call in flight.
+
+        A slot is awaited for each item in turn, so a large batch shares the pool
+        with other requests instead of filling the whole queue at once.
+
+        Args:
+            return_exceptions: Put the error of a failed item (including DecodeQueueFullError
+                and DecodeTimeoutError) in its place in the results instead of raising it,
+                so one bad item does not lose the results of the others.
+        """
+        results = [None] * len(items)
+        window = []
+
+        def collect(index: int, future: Future):
+            try:
+                results[index] = self.wait(future)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[index] = e
+
+        for index, item in enumerate(items):
+            if len(window) >= self.workers:
+                collect(*window.pop(0))
+            try:
+                future = self.submit(fn, item, block=True)
+            except DecodeQueueFullError as e:
+                if not return_exceptions:
+                    raise
+                results[index] = e
+                continue
+            window.append((index, future))
+        for index, future in window:
+            collect(index, future)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "job_timeout": self.job_timeout,
+                "in_flight": self._pending,
+                "queue_depth": max(0, self._pending - self.workers),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _finish(self, done: Future, result: Future):
+        self._release()
+        if done.cancelled():
+            result.cancel()
+            return
+        error = done.exception()
+        if error is not None:
+            if not result.cancelled():
+                result.set_exception(error)
+            return
+        value, waited = done.result()
+        with self._lock:
+            self._completed += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if not result.cancelled():
+            result.set_result(value)
+
+
+_engine: DecodeEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> DecodeEngine:
+    """Returns the process wide decode engine, creating it from Settings on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DecodeEngine(
+                    workers=settings.decode_workers,
+                    queue_size=settings.decode_queue_size,
+                    job_timeout=settings.decode_job_timeout_seconds,
+                    kind=settings.decode_pool_kind,
+                )
+    return _engine
+
+
+def shutdown_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.shutdown()
+            _engine = None
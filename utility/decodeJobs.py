@@ -0,0 +1,182 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from ..config.config import settings
+from .decodeEngine import DecodeEngine
+from .enums import DecodeJobStatusEnum
+from .lruCache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryJobStore:
+    """Keeps jobs in the worker process. Jobs are only visible to requests served by that worker."""
+
+    def __init__(self, max_entries: int, retention_seconds: float):
+        self.jobs = TTLCache(max_entries, retention_seconds)
+
+    def get(self, job_id: str) -> dict | None:
+        job = self.jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def put(self, job: dict):
+        self.jobs.set(job["id"], dict(job))
+
+    def delete(self, job_id: str):
+        self.jobs.delete(job_id)
+
+
+class SQLiteJobStore:
+    """
+    Keeps jobs in a SQLite file, so every uvicorn worker on the host can report any job.
+
+    Each call opens its own short lived connection, like SQLiteDecodeStore.
+    """
+
+    def __init__(self, path: str, max_entries: int, retention_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.retention_seconds = retention_seconds
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS decode_jobs ("
+                "id TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_decode_jobs_expires_at ON decode_jobs (expires_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=1.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM decode_jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, job: dict):
+        expires_at = time.time() + self.retention_seconds if self.retention_seconds > 0 else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO decode_jobs (id, value, expires_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), expires_at),
+            )
+
+    def delete(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM decode_jobs WHERE id = ?", (job_id,))
+
+    def purge(self) -> int:
+        """Deletes expired jobs, then the oldest ones beyond max_entries."""
+        with self._connect() as conn:
+            purged = conn.execute(
+                "DELETE FROM decode_jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            purged += conn.execute(
+                "DELETE FROM decode_jobs WHERE id IN (SELECT id FROM decode_jobs ORDER BY expires_at DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,)
+            ).rowcount
+        return purged
+
+
+_store: MemoryJobStore | SQLiteJobStore | None = None
+_pool: DecodeEngine | None = None
+_lock = threading.Lock()
+
+
+def get_store() -> MemoryJobStore | SQLiteJobStore:
+    """Returns the process wide job store: SQLite when DECODE_JOB_SQLITE_PATH is set, in-process otherwise."""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if settings.decode_job_sqlite_path:
+                    _store = SQLiteJobStore(settings.decode_job_sqlite_path, settings.decode_job_max_entries,
+                                            settings.decode_job_retention_seconds)
+                else:
+                    _store = MemoryJobStore(settings.decode_job_max_entries, settings.decode_job_retention_seconds)
+    return _store
+
+
+def get_pool() -> DecodeEngine:
+    """
+    Returns the pool running decode jobs. It bounds the jobs waiting or running at a time;
+    the decoding itself still happens on the decode engine.
+    """
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = DecodeEngine(workers=settings.decode_job_workers, queue_size=settings.decode_job_queue_size,
+                                     job_timeout=settings.decode_job_timeout_seconds)
+    return _pool
+
+
+def submit(user_id: str, fn, *args) -> dict:
+    """
+    Records a queued job for the user and runs fn(job, *args) on the job pool.
+
+    Returns:
+        The new job.
+
+    Raises:
+        DecodeQueueFullError: If the job pool has no free slot; no job is recorded then.
+    """
+    now = datetime.now().isoformat()
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "status": DecodeJobStatusEnum.QUEUED.value,
+        "created_at": now,
+        "finished_at": None,
+        "qr": None,
+        "error": None,
+    }
+    store = get_store()
+    if isinstance(store, SQLiteJobStore):
+        try:
+            store.purge()
+        except sqlite3.Error as e:
+            logger.warning("Decode job store purge failed", extra={"error": str(e)})
+    store.put(job)
+    # The worker updates its job dict in place, so the caller gets the job as it was queued
+    queued = dict(job)
+    try:
+        get_pool().submit(fn, job, *args)
+    except Exception:
+        store.delete(job["id"])
+        raise
+    return queued
+
+
+def update(job: dict, status: DecodeJobStatusEnum, **fields):
+    job.update(fields, status=status.value)
+    if status in (DecodeJobStatusEnum.SUCCEEDED, DecodeJobStatusEnum.FAILED):
+        job["finished_at"] = datetime.now().isoformat()
+    get_store().put(job)
+
+
+def get(job_id: str) -> dict | None:
+    return get_store().get(job_id)
+
+
+def shutdown_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class DecoderBackend:
+    """
+    A QR decoding library behind a common interface.
+
+    Subclasses import their library in load(), so it is only loaded when the backend
+    is configured, and raise ImportError or OSError there when it cannot be loaded.
+    """
+    name = ""
+
+    def load(self):
+        raise NotImplementedError
+
+    def decode(self, img: Image.Image) -> list[str]:
+        """Returns the data of every QR code found in img, a grayscale ('L' mode) image."""
+        raise NotImplementedError
+
+
+class PyzbarBackend(DecoderBackend):
+    """ZBar through pyzbar. Needs the native ZBar library."""
+    name = "pyzbar"
+
+    def load(self):
+        from pyzbar import pyzbar # For QR code decoding
+        self._pyzbar = pyzbar
+
+    def decode(self, img: Image.Image) -> list[str]:
+        decoded_values = []
+        # pyzbar.decode can find multiple barcodes/QR codes in one image
+        for obj in self._pyzbar.decode(img):
+            # Check if the decoded object is a QR Code
+            if obj.type == 'QRCODE':
+                # Data is returned as bytes, decode to UTF-8 string
+                decoded_values.append(obj.data.decode('utf-8'))
+        return decoded_values
+
+
+class OpenCVBackend(DecoderBackend):
+    """OpenCV's QRCodeDetector (opencv-python-headless)."""
+    name = "opencv"
+
+    def load(self):
+        import cv2
+        import numpy
+        self._cv2 = cv2
+        self._numpy = numpy
+
+    def decode(self, img: Image.Image) -> list[str]:
+        # A detector per call: QRCodeDetector keeps state and is not safe to share between threads
+        found, values, _, _ = self._cv2.QRCodeDetector().detectAndDecodeMulti(self._numpy.asarray(img))
+        return [value for value in values if value] if found else []
+
+
+class ZXingBackend(DecoderBackend):
+    """zxing-cpp, which also handles rotated and inverted codes."""
+    name = "zxingcpp"
+
+    def load(self):
+        import zxingcpp
+        self._zxingcpp = zxingcpp
+
+    def decode(self, img: Image.Image) -> list[str]:
+        return [barcode.text for barcode in self._zxingcpp.read_barcodes(img, formats=self._zxingcpp.BarcodeFormat.QRCode)]
+
+
+BACKENDS = {backend.name: backend for backend in (PyzbarBackend, OpenCVBackend, ZXingBackend)}
+
+
+def parse_backend_names(value: str) -> list[str]:
+    """Splits a comma separated QR_DECODER_BACKENDS value into backend names, keeping their order."""
+    return [name.strip().lower() for name in value.split(",") if name.strip()]
+
+
+def load_backends(names: list[str]) -> tuple[list[DecoderBackend], dict[str, str]]:
+    """
+    Loads the named backends.
+
+    Returns:
+        The backends that loaded, in the given order, and {name: error} for the ones that did not.
+    """
+    loaded = []
+    errors = {}
+    for name in names:
+        backend_class = BACKENDS.get(name)
+        if backend_class is None:
+            errors[name] = f"Unknown QR decoder backend, expected one of: {', '.join(BACKENDS)}"
+            continue
+        backend = backend_class()
+        try:
+            backend.load()
+        except (ImportError, OSError) as e:
+            errors[name] = str(e)
+            continue
+        loaded.append(backend)
+    return loaded, errors
@@ -4,7 +4,27 @@ class UserRoleEnum(str, Enum):
     ADMIN = "ADMIN"
     USER = "USER"
     
+class ExportFormatEnum(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 class QRSourceEnum(str, Enum):
     DIRECT_VALUE = "DIRECT_VALUE"
     IMAGE_DATA = "IMAGE_DATA"
-    IMAGE_FILE = "IMAGE_FILE"
\ No newline at end of file
+    IMAGE_FILE = "IMAGE_FILE"
+
+class QRImageFormatEnum(str, Enum):
+    PNG = "png"
+    SVG = "svg"
+
+class QRErrorCorrectionEnum(str, Enum):
+    L = "L"
+    M = "M"
+    Q = "Q"
+    H = "H"
+
+class DecodeJobStatusEnum(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
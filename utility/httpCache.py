@@ -0,0 +1,102 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+# Polled reads may be stored by the client, but must be revalidated on every use
+REVALIDATE = "private, no-cache"
+
+NOT_MODIFIED_RESPONSES = {status.HTTP_304_NOT_MODIFIED: {"description": "Unchanged since the version named by If-None-Match or If-Modified-Since"}}
+
+
+def strong_etag(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def _version(id: str, updated_at: datetime) -> str:
+    return f"{id}@{updated_at.isoformat()}"
+
+
+def row_etag(id: str, updated_at: datetime) -> str:
+    """The ETag of one row: a digest of its id and updated_at, so it changes with every update."""
+    return strong_etag(hashlib.sha256(_version(id, updated_at).encode()).hexdigest()[:32])
+
+
+def page_etag(rows) -> str:
+    """
+    The ETag of a page of rows, from the id and updated_at of each row in order.
+
+    Rows added to, removed from or updated on the page all change it.
+    """
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(_version(row.id, row.updated_at).encode())
+        digest.update(b"\n")
+    return strong_etag(digest.hexdigest()[:32])
+
+
+def _as_utc(value: datetime) -> datetime:
+    # TIMESTAMP columns come back naive from some drivers; they hold UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def row_headers(id: str, updated_at: datetime) -> dict:
+    return {"ETag": row_etag(id, updated_at),
+            "Last-Modified": format_datetime(_as_utc(updated_at), usegmt=True),
+            "Cache-Control": REVALIDATE}
+
+
+def page_headers(rows) -> dict:
+    # No Last-Modified: a row leaving the page does not move the newest updated_at,
+    # so If-Modified-Since could not tell that the page changed
+    return {"ETag": page_etag(rows), "Cache-Control": REVALIDATE}
+
+
+def is_conditional(request: Request) -> bool:
+    """Whether the request carries a validator worth checking with a cheap version query first."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Evaluates an If-None-Match header against the current ETag.
+
+    If-None-Match uses the weak comparison (RFC 9110 13.1.2), so a W/ prefix is ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(if_modified_since: str | None, last_modified: str | None) -> bool:
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        # An invalid date is ignored, as RFC 9110 13.1.3 requires
+        return False
+    if since.tzinfo is None:
+        return False
+    return parsedate_to_datetime(last_modified) <= since
+
+
+def not_modified(request: Request, headers: dict) -> Response | None:
+    """
+    Returns a 304 carrying headers when the request's validators match them, None otherwise.
+
+    If-None-Match is checked against headers['ETag']; If-Modified-Since against
+    headers['Last-Modified'], and only when the request has no If-None-Match.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = etag_matches(if_none_match, headers["ETag"])
+    else:
+        matched = _not_modified_since(request.headers.get("if-modified-since"), headers.get("Last-Modified"))
+    if matched:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
@@ -0,0 +1,133 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config.config import settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request, by route template.",
+    ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database statements executed per request.",
+    ["method", "route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Total time spent in database statements per request.",
+    ["method", "route"], buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DECODE_SECONDS = Histogram(
+    "qr_decode_duration_seconds", "Time spent opening and decoding one uploaded image.",
+    ["result"], buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DECODE_BYTES = Histogram(
+    "qr_decode_image_bytes", "Size of each decoded image file.",
+    buckets=(10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000),
+)
+DECODE_PIXELS = Histogram(
+    "qr_decode_image_pixels", "Width times height of each decoded image.",
+    buckets=(65_536, 262_144, 1_048_576, 2_097_152, 4_194_304, 8_388_608, 16_777_216, 67_108_864),
+)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+# Set by MetricsMiddleware for the duration of each request. Starlette copies the context
+# into the threadpool, so statements run by sync routes are counted as well.
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context, not the connection: a failed statement
+    # never reaches after_cursor_execute, and its start time must not outlive it
+    if context is not None:
+        context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "_query_started_at", None)
+    stats = _request_stats.get()
+    if stats is not None and started_at is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started_at
+
+
+def instrument_queries():
+    """Counts and times the statements of every engine, including the lazily built async one."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_decode(size_bytes: int, dimensions: tuple[int, int] | None, seconds: float, result: str):
+    """Records one image decode; result is 'found', 'empty' or 'error'."""
+    DECODE_SECONDS.labels(result).observe(seconds)
+    DECODE_BYTES.observe(size_bytes)
+    if dimensions is not None:
+        DECODE_PIXELS.observe(dimensions[0] * dimensions[1])
+
+
+def route_template(scope) -> str:
+    # Label by the route's path template, never the raw path, to keep label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and database work of every HTTP request, and logs the slow ones.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so streamed responses are
+    timed to their last chunk and no extra task is spawned per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            method, route = scope["method"], route_template(scope)
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+            if elapsed * 1000 >= settings.log_slow_request_ms:
+                logger.warning("slow request", extra={
+                    "method": method, "route": route, "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 3), "db_queries": stats.queries,
+                    "db_ms": round(stats.db_seconds * 1000, 3),
+                })
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
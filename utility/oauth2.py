@@ -1,23 +1,38 @@
-from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
+import hashlib
+import hmac
+import logging
+import secrets
+import uuid
 
 from . import enums
 
 from ..config import database
 
-from ..schemas import schemas
+from ..schemas import schemas, userSchemas
 
-from ..models import userModel
+from ..models import userModel, tokenModel
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from ..config.config import settings
+from .lruCache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
+
+
+def load_jwt():
+    """Imports python-jose and its crypto backend on first use or in the warm-up, not at import time."""
+    from jose import jwt
+    return jwt
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -27,13 +42,61 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15) # Default expiration
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = load_jwt().encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def _hash_refresh_secret(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def create_refresh_token(user_id: str, family_id: str | None = None) -> tuple[str, tokenModel.RefreshToken]:
+    """
+    Creates an opaque refresh token of the form '<token id>.<random secret>'.
+
+    Only a SHA-256 of the secret is stored, so the returned row can be added to
+    the session as is and the plain token handed to the client once.
+
+    Args:
+        user_id: The id of the user the token authenticates.
+        family_id: The family of the token being rotated, or None for a new login.
+
+    Returns:
+        The plain refresh token and its unsaved RefreshToken row.
+    """
+    token_id = str(uuid.uuid4())
+    secret = secrets.token_urlsafe(32)
+    row = tokenModel.RefreshToken(
+        id=token_id,
+        family_id=family_id or token_id,
+        token_hash=_hash_refresh_secret(secret),
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        revoked=False,
+    )
+    return f"{token_id}.{secret}", row
+
+
+def split_refresh_token(token: str, credentials_exception) -> tuple[str, str]:
+    token_id, _, secret = token.partition(".")
+    if not token_id or not secret:
+        raise credentials_exception
+    return token_id, secret
+
+
+def refresh_token_matches(row: tokenModel.RefreshToken, secret: str) -> bool:
+    return hmac.compare_digest(row.token_hash, _hash_refresh_secret(secret))
+
+
+def refresh_token_expired(row: tokenModel.RefreshToken) -> bool:
+    return row.expires_at <= datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 def verify_access_token(token: str, credentials_exception):
+    from jose import JWTError
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = load_jwt().decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         id: str = payload.get("sub")
         name: str = payload.get("name")
         role: str = payload.get("role")
@@ -41,19 +104,68 @@ def verify_access_token(token: str, credentials_exception):
             raise credentials_exception
         token_data = schemas.TokenData(id=id, role=role, name=name)
     except JWTError as e:
-        print('JWTError',e)
+        logger.info("Rejected access token", extra={"error": str(e)})
         raise credentials_exception
 
     return token_data
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                detail=f"Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+def credentials_exception():
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                         detail=f"Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+
+# Detached snapshots of authenticated users, keyed by user id
+user_cache = TTLCache(settings.auth_user_cache_max_entries, settings.auth_user_cache_ttl_seconds)
+
+def invalidate_user(user_id: str):
+    """Drops a cached principal; call it whenever a user is disabled, changed or deleted."""
+    user_cache.delete(str(user_id))
 
-    token = verify_access_token(token, credentials_exception)
+def _principal_or_reject(user: userModel.User | None) -> userSchemas.UserPrincipal:
+    if user is None or user.disabled:
+        raise credentials_exception()
+    principal = userSchemas.UserPrincipal.model_validate(user)
+    user_cache.set(principal.id, principal)
+    return principal
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    token = verify_access_token(token, credentials_exception())
+    # Commits of the request session count as this user's writes (see database.note_write)
+    db.info["user_id"] = str(token.id)
+    principal = user_cache.get(str(token.id))
+    if principal is not None:
+        return principal
     user = db.query(userModel.User).filter(userModel.User.id == str(token.id)).first()
-    return user
+    return _principal_or_reject(user)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db = Depends(database.get_async_db)):
+    token = verify_access_token(token, credentials_exception())
+    db.info["user_id"] = str(token.id)
+    principal = user_cache.get(str(token.id))
+    if principal is not None:
+        return principal
+    result = await db.execute(select(userModel.User).where(userModel.User.id == str(token.id)))
+    return _principal_or_reject(result.scalars().first())
+
+def principal_from_claims(token: schemas.TokenData) -> userSchemas.UserPrincipal:
+    try:
+        return userSchemas.UserPrincipal(id=token.id, name=token.name or '', role=token.role)
+    except ValueError:
+        raise credentials_exception()
+
+def get_current_user_readonly(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    """
+    Dependency for read-only routes. With AUTH_TRUST_TOKEN_CLAIMS enabled, the signed
+    'sub', 'name' and 'role' claims are trusted and no users lookup happens at all.
+    """
+    if settings.auth_trust_token_claims:
+        return principal_from_claims(verify_access_token(token, credentials_exception()))
+    return get_current_user(token, db)
+
+async def get_current_user_readonly_async(token: str = Depends(oauth2_scheme), db = Depends(database.get_async_db)):
+    if settings.auth_trust_token_claims:
+        return principal_from_claims(verify_access_token(token, credentials_exception()))
+    return await get_current_user_async(token, db)
 
-def isAdmin(user: userModel.User):
+def isAdmin(user: userModel.User | userSchemas.UserPrincipal):
     return user.role == enums.UserRoleEnum.ADMIN
\ No newline at end of file
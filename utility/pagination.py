@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+from .responses import ORJSONResponse
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    """Encodes the (created_at, id) of the last row of a page as an opaque cursor."""
+    raw = json.dumps([created_at.isoformat(), id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Invalid cursor")
+
+
+def paginate(query, model, filter_query):
+    """
+    Orders a Query or Select newest first by (created_at, id) and applies the page window.
+
+    With a cursor, only rows after the cursor position are read, so the index on
+    (..., created_at, id) makes every page cost the same as the first one.
+    Without a cursor, the offset/limit window is applied as before.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if filter_query.cursor:
+        created_at, id = decode_cursor(filter_query.cursor)
+        query = query.filter(or_(model.created_at < created_at,
+                                 and_(model.created_at == created_at, model.id < id)))
+    else:
+        query = query.offset(filter_query.offset)
+    return query.limit(filter_query.limit)
+
+
+def next_cursor(rows, limit: int) -> str | None:
+    """Returns the cursor of the page after rows, or None when rows is the last page."""
+    if len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def set_next_cursor(response, rows, limit: int):
+    cursor = next_cursor(rows, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+
+
+def fast_page_response(rows, fields: list[str], limit: int):
+    """
+    Renders a page of column rows straight to JSON with orjson, skipping response
+    model validation. The rows must also hold created_at and id for the cursor.
+    """
+    headers = {}
+    cursor = next_cursor(rows, limit)
+    if cursor:
+        headers["X-Next-Cursor"] = cursor
+    content = [{field: getattr(row, field) for field in fields} for row in rows]
+    return ORJSONResponse(content, headers=headers)
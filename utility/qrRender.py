@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import threading
+from typing import NamedTuple
+
+from ..config.config import settings
+from .enums import QRErrorCorrectionEnum, QRImageFormatEnum
+from .lruCache import TTLCache
+
+# Part of every render key: bump it when the output of render() changes for the same
+# parameters, so clients holding an old ETag get the new image
+RENDER_VERSION = 1
+
+MEDIA_TYPES = {
+    QRImageFormatEnum.PNG: "image/png",
+    QRImageFormatEnum.SVG: "image/svg+xml",
+}
+
+_cache: TTLCache | None = None
+_cache_lock = threading.Lock()
+
+
+class RenderedQR(NamedTuple):
+    content: bytes
+    media_type: str
+
+
+def get_cache() -> TTLCache:
+    """Returns the process wide cache of rendered images, keyed by render_key()."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTLCache(settings.qr_render_cache_max_entries, settings.qr_render_cache_ttl_seconds)
+    return _cache
+
+
+def render_key(data: str, image_format: QRImageFormatEnum, size: int,
+               error_correction: QRErrorCorrectionEnum, border: int) -> str:
+    """
+    Returns the SHA-256 hex digest of the payload and every render parameter.
+
+    Rendering is deterministic, so the key identifies the image bytes: it is both the
+    cache key and the strong ETag, and a request can be answered with 304 before rendering.
+    """
+    params = [RENDER_VERSION, data, image_format.value, size, error_correction.value, border]
+    return hashlib.sha256(json.dumps(params).encode("utf-8")).hexdigest()
+
+
+def render(data: str, image_format: QRImageFormatEnum, size: int,
+           error_correction: QRErrorCorrectionEnum, border: int) -> RenderedQR:
+    """
+    Renders data as a QR code image of size x size pixels, through the render cache.
+
+    Raises:
+        ValueError: If data does not fit in a QR code, or size is too small for its modules
+            or over QR_RENDER_MAX_SIZE.
+    """
+    key = render_key(data, image_format, size, error_correction, border)
+    cache = get_cache()
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = _render(data, image_format, size, error_correction, border)
+        cache.set(key, rendered)
+    return rendered
+
+
+def _modules(data: str, error_correction: QRErrorCorrectionEnum, border: int) -> list[list[bool]]:
+    import qrcode
+    from qrcode.exceptions import DataOverflowError
+
+    code = qrcode.QRCode(error_correction=getattr(qrcode.constants, f"ERROR_CORRECT_{error_correction.value}"),
+                         border=border)
+    code.add_data(data)
+    try:
+        code.make(fit=True)
+    except (DataOverflowError, ValueError):
+        # fit=True reports data past version 40 as an invalid version (ValueError)
+        raise ValueError("Data is too long for a QR code")
+    # Includes the quiet zone of `border` modules
+    return code.get_matrix()
+
+
+def _render(data: str, image_format: QRImageFormatEnum, size: int,
+            error_correction: QRErrorCorrectionEnum, border: int) -> RenderedQR:
+    if size > settings.qr_render_max_size:
+        raise ValueError(f"Size is over the limit of {settings.qr_render_max_size} pixels")
+    modules = _modules(data, error_correction, border)
+    count = len(modules)
+    if size < count:
+        raise ValueError(f"Size must be at least {count} pixels for this data")
+
+    if image_format == QRImageFormatEnum.SVG:
+        content = _svg(modules, size)
+    else:
+        content = _png(modules, size)
+    return RenderedQR(content, MEDIA_TYPES[image_format])
+
+
+def _png(modules: list[list[bool]], size: int) -> bytes:
+    from PIL import Image
+
+    count = len(modules)
+    img = Image.frombytes('L', (count, count), bytes(0 if dark else 255 for row in modules for dark in row))
+    # Whole pixels per module keep the edges sharp; the remainder widens the quiet zone
+    scale = size // count
+    img = img.resize((count * scale, count * scale), Image.Resampling.NEAREST)
+    canvas = Image.new('1', (size, size), 1)
+    offset = (size - count * scale) // 2
+    canvas.paste(img.convert('1'), (offset, offset))
+    buffer = io.BytesIO()
+    canvas.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _svg(modules: list[list[bool]], size: int) -> bytes:
+    # One path, with a rectangle per horizontal run of dark modules
+    path = []
+    for y, row in enumerate(modules):
+        x = 0
+        while x < len(row):
+            if row[x]:
+                start = x
+                while x < len(row) and row[x]:
+                    x += 1
+                path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    count = len(modules)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {count} {count}" shape-rendering="crispEdges">'
+        f'<rect width="{count}" height="{count}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/></svg>'
+    ).encode("utf-8")
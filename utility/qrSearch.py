@@ -0,0 +1,78 @@
+from sqlalchemy import column, event, literal_column, or_, select, table, text
+from sqlalchemy.dialects.mysql import match
+
+from ..models import qrModel
+
+# SQLite stand-in for the MySQL FULLTEXT index: an external content FTS5 table over
+# qr.data and qr.path, kept in sync with qr by triggers (so Core bulk inserts are covered too)
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS qr_fts USING fts5(data, path, content='qr', content_rowid='rowid')",
+    "CREATE TRIGGER IF NOT EXISTS qr_fts_insert AFTER INSERT ON qr BEGIN "
+    "INSERT INTO qr_fts(rowid, data, path) VALUES (new.rowid, new.data, new.path); END",
+    "CREATE TRIGGER IF NOT EXISTS qr_fts_delete AFTER DELETE ON qr BEGIN "
+    "INSERT INTO qr_fts(qr_fts, rowid, data, path) VALUES ('delete', old.rowid, old.data, old.path); END",
+    "CREATE TRIGGER IF NOT EXISTS qr_fts_update AFTER UPDATE OF data, path ON qr BEGIN "
+    "INSERT INTO qr_fts(qr_fts, rowid, data, path) VALUES ('delete', old.rowid, old.data, old.path); "
+    "INSERT INTO qr_fts(rowid, data, path) VALUES (new.rowid, new.data, new.path); END",
+]
+
+
+qr_fts = table("qr_fts", column("rowid"))
+
+
+def install_sqlite_fts(connection):
+    """Creates the FTS5 table and its triggers, and indexes any rows already in qr."""
+    created = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'qr_fts'").first() is None
+    for statement in SQLITE_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if created:
+        connection.exec_driver_sql("INSERT INTO qr_fts(qr_fts) VALUES ('rebuild')")
+
+
+@event.listens_for(qrModel.QR.__table__, "after_create")
+def create_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        install_sqlite_fts(connection)
+
+
+def ensure_search_index(engine):
+    """
+    Installs qr_fts on a SQLite database whose qr table already exists, such as one created
+    before the search index, backfilling its rows. Idempotent; a no-op on other databases.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        if connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'qr'").first() is not None:
+            install_sqlite_fts(connection)
+
+
+def fts5_query(q: str) -> str:
+    # Quote every term, so URL fragments and product codes are matched literally
+    # instead of being parsed as FTS5 operators
+    terms = ['"' + term.replace('"', '""') + '"' for term in q.split()]
+    return " ".join(terms)
+
+
+def search_statement(dialect: str, q: str):
+    """
+    Returns a select of qrModel.QR matching q, best match first, for the sync and the
+    async sessions alike.
+
+    MySQL uses the FULLTEXT index on (data, path) in natural language mode and
+    SQLite the qr_fts FTS5 table ranked by bm25. Other databases fall back to an
+    unranked LIKE scan.
+    """
+    if dialect == "mysql":
+        score = match(qrModel.QR.data, qrModel.QR.path, against=q).in_natural_language_mode()
+        return select(qrModel.QR).where(score).order_by(score.desc(), qrModel.QR.id)
+    if dialect == "sqlite":
+        return select(qrModel.QR) \
+            .join(qr_fts, qr_fts.c.rowid == literal_column("qr.rowid")) \
+            .where(text("qr_fts MATCH :fts_query").bindparams(fts_query=fts5_query(q))) \
+            .order_by(text("bm25(qr_fts)"), qrModel.QR.id)
+    pattern = f"%{q}%"
+    return select(qrModel.QR).where(or_(qrModel.QR.data.like(pattern), qrModel.QR.path.like(pattern))) \
+        .order_by(qrModel.QR.created_at.desc(), qrModel.QR.id)
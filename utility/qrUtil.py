@@ -1,56 +1,336 @@
+from __future__ import annotations
+
 import base64
 import io
-from PIL import Image # Pillow library for image handling
-
-try:
-    from pyzbar import pyzbar # For QR code decoding
-except ImportError:
-    print("-------------------------------------------------------")
-    print("ERROR: 'pyzbar' library found, but failed to import.")
-    print("This usually means the underlying 'ZBar' library is missing or not configured correctly.")
-    print("\nPlease ensure ZBar is installed on your system:")
-    print("  - Debian/Ubuntu: sudo apt-get install zbar-tools libzbar-dev")
-    print("  - macOS: brew install zbar")
-    print("  - Windows: Download ZBar DLLs/binaries and add to PATH (check pyzbar docs)")
-    print("  - Fedora: sudo dnf install zbar-devel")
-    print("-------------------------------------------------------")
-    exit(1) # Exit if the core dependency isn't working
-
-def decode_qr_from_image_object(img: Image.Image) -> list[str]:
+import logging
+import os
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from . import decodeCache, decoders, metrics
+from ..config.config import settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Pillow and the decoder backends (pyzbar loads the native ZBar library) are imported on
+# first use or by the application warm-up, not when this module is imported.
+_backends: list[decoders.DecoderBackend] | None = None
+_backend_error: str | None = None
+_backend_lock = threading.Lock()
+
+# Frames of multi-frame images and PDF pages are decoded on their own pool, never on the
+# decode engine, so a job waiting for its frames cannot starve the engine of slots.
+_frame_pool: ThreadPoolExecutor | None = None
+_frame_pool_lock = threading.Lock()
+# pdfium is not thread safe, so PDF documents are opened and rendered one at a time
+_pdfium_lock = threading.Lock()
+
+class DecoderUnavailableError(Exception):
+    """Raised when none of the configured decoder backends can be loaded."""
+
+class ImageLimitError(ValueError):
+    """Raised when an image holds more frames or pixels than the limits in Settings."""
+
+@dataclass
+class DecodeStats:
+    """What metrics.observe_decode records about one decode."""
+    size_bytes: int
+    dimensions: tuple[int, int] | None
+    seconds: float
+    result: str
+
+class DecodedValues(list):
+    """
+    The QR values found in one image, with the name of the decoder backend that found them
+    and the index of the frame (or PDF page) each value was found in.
+
+    An image rejected before decoding (see ImageLimitError) comes back empty, with the
+    reason in `error`. A fresh decode carries its `stats`, which observe_decoded records;
+    cached values have none.
+    """
+
+    def __init__(self, values=(), backend: str | None = None, frames: list[int] | None = None,
+                 error: str | None = None, stats: DecodeStats | None = None):
+        super().__init__(values)
+        self.backend = backend
+        self.frames = frames if frames is not None else [0] * len(self)
+        self.error = error
+        self.stats = stats
+
+def load_decoder() -> list[decoders.DecoderBackend]:
+    """
+    Imports Pillow and the decoder backends listed in QR_DECODER_BACKENDS.
+
+    Backends that fail to load are logged and left out of the chain. The outcome is
+    remembered, so later calls fail fast instead of retrying the imports.
+
+    Returns:
+        The loaded backends, in the configured order.
+
+    Raises:
+        DecoderUnavailableError: If no configured backend can be loaded.
+    """
+    global _backends, _backend_error
+    if _backends is None and _backend_error is None:
+        with _backend_lock:
+            if _backends is None and _backend_error is None:
+                import PIL.Image # Pillow library for image handling
+
+                loaded, errors = decoders.load_backends(decoders.parse_backend_names(settings.qr_decoder_backends))
+                for name, error in errors.items():
+                    logger.warning("QR decoder backend could not be loaded", extra={"backend": name, "error": error})
+                if "pyzbar" in errors:
+                    logger.warning(
+                        "This usually means the underlying 'ZBar' library is missing or not configured correctly. "
+                        "Install it with: sudo apt-get install zbar-tools libzbar-dev (Debian/Ubuntu), brew install "
+                        "zbar (macOS), sudo dnf install zbar-devel (Fedora), or add the ZBar DLLs to PATH (Windows, "
+                        "see the pyzbar docs).")
+                if loaded:
+                    _backends = loaded
+                else:
+                    _backend_error = "; ".join(f"{name}: {error}" for name, error in errors.items()) or "no backend configured"
+                    logger.critical("No QR decoder backend could be loaded", extra={"error": _backend_error})
+    if _backends is None:
+        raise DecoderUnavailableError(f"QR decoder is not available: {_backend_error}")
+    return _backends
+
+def decoder_loaded() -> bool:
+    return _backends is not None
+
+def reset_decoder():
+    """Forgets the loaded backends, so the next decode loads QR_DECODER_BACKENDS again."""
+    global _backends, _backend_error
+    with _backend_lock:
+        _backends = None
+        _backend_error = None
+
+def _scan_image(img: Image.Image) -> DecodedValues:
+    """
+    Runs the decoder backends over an image as-is, in the configured order, and returns
+    the values of the first backend that finds any QR code. A backend that raises is
+    skipped like one that finds nothing.
+
+    Raises:
+        DecoderUnavailableError: If no decoder backend can be loaded.
+    """
+    for backend in load_decoder():
+        try:
+            decoded_values = backend.decode(img)
+        except Exception as e:
+            logger.debug("QR decoder backend failed", extra={"backend": backend.name, "error": str(e)})
+            continue
+        if decoded_values:
+            return DecodedValues(decoded_values, backend.name)
+    return DecodedValues()
+
+def _record(timings: dict | None, stage: str, started: float) -> float:
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = round((now - started) * 1000, 3)
+    return now
+
+def preprocess_image(img: Image.Image, max_dimension: int, timings: dict | None = None) -> Image.Image:
+    """
+    Prepares an image for the decoder backends: reduced-resolution JPEG decoding, 8-bit grayscale
+    and downscaling so that neither side exceeds max_dimension.
+
+    Args:
+        img: A PIL.Image.Image object. Draft mode only applies if it is not loaded yet.
+        max_dimension: The largest width or height handed to the decoder. 0 disables downscaling.
+        timings: Optional dict that receives the duration of each stage in milliseconds.
+
+    Returns:
+        A grayscale ('L' mode) image.
+    """
+    from PIL import Image
+
+    started = time.perf_counter()
+    source = img
+    if max_dimension and img.format == 'JPEG':
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+        img.draft('L', (max_dimension, max_dimension))
+    started = _record(timings, 'draft', started)
+
+    if img.mode != 'L':
+        img = img.convert('L')
+    else:
+        img.load()
+    started = _record(timings, 'grayscale', started)
+
+    if max_dimension and max(img.size) > max_dimension:
+        # thumbnail() resizes in place, so never shrink the caller's image
+        img = img.copy() if img is source else img
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.BILINEAR)
+    _record(timings, 'downscale', started)
+    return img
+
+def _threshold(img: Image.Image, threshold: int) -> Image.Image:
+    return img.point(lambda value: 255 if value > threshold else 0)
+
+def decode_qr_from_image_object(img: Image.Image, reopen=None, timings: dict | None = None) -> DecodedValues:
     """
     Decodes QR codes found within a given Pillow Image object.
 
+    With preprocessing enabled in Settings, a fast pass decodes a downscaled grayscale
+    copy. When it finds nothing, the optional retries binarize that copy with a fixed
+    threshold and then decode at full resolution.
+
     Args:
         img: A PIL.Image.Image object.
+        reopen: Optional callable returning a fresh Image of the same source. It is
+            needed for the full resolution retry when JPEG draft mode was applied.
+        timings: Optional dict that receives the duration of each stage in milliseconds.
 
     Returns:
-        A list of strings, where each string is the decoded data from a found QR code.
+        A list of strings, where each string is the decoded data from a found QR code,
+        with the name of the backend that decoded them in its `backend` attribute.
         Returns an empty list if no QR codes are found or if an error occurs.
+
+    Raises:
+        DecoderUnavailableError: If no decoder backend can be loaded.
     """
-    decoded_values = []
     try:
-        # pyzbar.decode can find multiple barcodes/QR codes in one image
-        decoded_objects = pyzbar.decode(img)
+        if not settings.qr_preprocess_enabled:
+            started = time.perf_counter()
+            decoded_values = _scan_image(img)
+            _record(timings, 'decode', started)
+            return decoded_values
+
+        original_size = img.size
+        max_dimension = settings.qr_preprocess_max_dimension
+        prepared = preprocess_image(img, max_dimension, timings)
+        started = time.perf_counter()
+        decoded_values = _scan_image(prepared)
+        started = _record(timings, 'decode', started)
+        if decoded_values or not settings.qr_preprocess_retry:
+            return decoded_values
 
-        if not decoded_objects:
-            # print("No QR codes found in the image.") # Optional message
-            return []
+        decoded_values = _scan_image(_threshold(prepared, settings.qr_preprocess_threshold))
+        started = _record(timings, 'retry_threshold', started)
+        if decoded_values:
+            return decoded_values
 
-        for obj in decoded_objects:
-            # Check if the decoded object is a QR Code
-            if obj.type == 'QRCODE':
-                # Data is returned as bytes, decode to UTF-8 string
-                qr_data = obj.data.decode('utf-8')
-                decoded_values.append(qr_data)
-                # print(f"Found QR Code. Type: {obj.type}, Data: '{qr_data}'") # Debugging
+        if prepared.size != original_size:
+            full = reopen() if reopen is not None and img.size != original_size else img
+            decoded_values = _scan_image(preprocess_image(full, 0))
+            _record(timings, 'retry_full_resolution', started)
+        return decoded_values
 
+    except DecoderUnavailableError:
+        raise
     except Exception as e:
-        print(f"An error occurred during QR decoding: {e}")
-        return []
+        logger.warning("QR decoding failed", extra={"error": str(e)})
+        return DecodedValues()
 
-    return decoded_values
+def _get_frame_pool() -> ThreadPoolExecutor:
+    global _frame_pool
+    if _frame_pool is None:
+        with _frame_pool_lock:
+            if _frame_pool is None:
+                _frame_pool = ThreadPoolExecutor(max_workers=settings.qr_frame_workers or os.cpu_count(),
+                                                 thread_name_prefix="qr-frame")
+    return _frame_pool
+
+def _check_frame_limits(frames: int, pixels: int):
+    if frames > settings.qr_max_frames:
+        raise ImageLimitError(f"Image has more than {settings.qr_max_frames} frames or pages")
+    if pixels > settings.qr_max_total_pixels:
+        raise ImageLimitError(f"Image has more than {settings.qr_max_total_pixels} pixels over all frames or pages")
+
+def _decode_frames(frames) -> DecodedValues:
+    """
+    Decodes frame images in parallel on the frame pool.
+
+    Args:
+        frames: An iterable of Pillow images, produced lazily so the limits are checked
+            before the next frame is even extracted.
+
+    Raises:
+        ImageLimitError: If the frames exceed the frame count or total pixel limit.
+    """
+    pool = _get_frame_pool()
+    futures = []
+    pixels = 0
+    try:
+        for index, frame in enumerate(frames):
+            pixels += frame.size[0] * frame.size[1]
+            _check_frame_limits(index + 1, pixels)
+            futures.append(pool.submit(decode_qr_from_image_object, frame))
+    except ImageLimitError:
+        for future in futures:
+            future.cancel()
+        raise
+
+    values, frame_indexes, backend = [], [], None
+    for index, future in enumerate(futures):
+        frame_values = future.result()
+        values.extend(frame_values)
+        frame_indexes.extend([index] * len(frame_values))
+        backend = backend or frame_values.backend
+    return DecodedValues(values, backend, frame_indexes)
+
+def _image_frames(img: Image.Image):
+    # seek() is stateful, so frames are copied out one by one on the calling thread
+    for index in range(img.n_frames):
+        img.seek(index)
+        yield img.convert('L')
+
+def decode_qr_from_frames(img: Image.Image) -> DecodedValues:
+    """
+    Decodes every frame of a multi-frame image (multi-page TIFF, animated GIF, WebP or PNG) in parallel.
+
+    Raises:
+        ImageLimitError: If the image exceeds QR_MAX_FRAMES or QR_MAX_TOTAL_PIXELS.
+        DecoderUnavailableError: If no decoder backend can be loaded.
+    """
+    _check_frame_limits(img.n_frames, 0)
+    return _decode_frames(_image_frames(img))
+
+def is_pdf(contents: bytes) -> bool:
+    return contents[:5] == b'%PDF-'
 
-def decode_qr_from_file(file_path: str) -> list[str]:
+def decode_qr_from_pdf(contents: bytes) -> DecodedValues:
+    """
+    Renders every page of a PDF at QR_PDF_RENDER_DPI in grayscale and decodes the pages in parallel.
+
+    Raises:
+        ImageLimitError: If the document exceeds QR_MAX_FRAMES or QR_MAX_TOTAL_PIXELS.
+        ValueError: If pypdfium2 is not installed.
+        DecoderUnavailableError: If no decoder backend can be loaded.
+    """
+    try:
+        import pypdfium2
+    except ImportError:
+        raise ValueError("PDF files need the optional pypdfium2 package")
+
+    scale = settings.qr_pdf_render_dpi / 72
+    pages = []
+    with _pdfium_lock:
+        document = pypdfium2.PdfDocument(contents)
+        try:
+            _check_frame_limits(len(document), 0)
+            pixels = 0
+            for index in range(len(document)):
+                page = document[index]
+                width, height = page.get_size()
+                # Checked from the page size, before paying for the render
+                pixels += int(width * scale) * int(height * scale)
+                _check_frame_limits(index + 1, pixels)
+                pages.append(page.render(scale=scale, grayscale=True).to_pil())
+                page.close()
+        finally:
+            document.close()
+    return _decode_frames(pages)
+
+def decode_qr_from_file(file_path: str) -> DecodedValues:
     """
     Opens an image file, decodes any QR codes found, and returns their values.
 
@@ -59,43 +339,141 @@ def decode_qr_from_file(file_path: str) -> list[str]:
 
     Returns:
         A list of decoded QR code data strings, or an empty list on failure/not found.
+
+    Raises:
+        DecoderUnavailableError: If no decoder backend can be loaded.
     """
+    from PIL import Image
+
     try:
         # Open the image file using Pillow
         img = Image.open(file_path)
-        return decode_qr_from_image_object(img)
+        return decode_qr_from_image_object(img, reopen=lambda: Image.open(file_path))
     except FileNotFoundError:
-        print(f"Error: File not found at '{file_path}'")
-        return []
+        logger.warning("Image file not found", extra={"file": file_path})
+        return DecodedValues()
+    except DecoderUnavailableError:
+        raise
     except Exception as e:
         # Catches potential errors during file opening or image processing
-        print(f"Error opening or processing image file '{file_path}': {e}")
-        return []
+        logger.warning("Could not open or process image file", extra={"file": file_path, "error": str(e)})
+        return DecodedValues()
     
-def decode_qr_from_file_content(contents: bytes) -> list[str]:
+def decode_qr_from_file_content(contents: bytes) -> DecodedValues:
     """
-    Opens an image file, decodes any QR codes found, and returns their values.
+    Opens an in-memory image file, decodes any QR codes found, and returns their values.
+
+    Results are cached by a hash of the raw bytes, so a repeated image skips Image.open
+    and the decoder backends entirely. Code running decodes on the decode engine does the
+    cache lookup itself (see lookup_decoded) and hands decode_qr_from_image_bytes to the pool.
 
     Args:
-        file_path: The path to the image file (e.g., 'my_qrcode.png').
+        contents: The raw bytes of the image file.
 
     Returns:
         A list of decoded QR code data strings, or an empty list on failure/not found.
+
+    Raises:
+        DecoderUnavailableError: If no decoder backend can be loaded.
+    """
+    key, cached = lookup_decoded(contents)
+    if cached is not None:
+        return cached
+    decoded_values = decode_qr_from_image_bytes(contents)
+    observe_decoded(decoded_values)
+    store_decoded(key, decoded_values)
+    return decoded_values
+
+def lookup_decoded(contents: bytes) -> tuple[str | None, DecodedValues | None]:
     """
+    Looks an image up in the decode cache.
+
+    Returns:
+        The cache key to pass to store_decoded (None when the cache is disabled), and the
+        cached values, or None on a miss.
+    """
+    cache = decodeCache.get_cache()
+    if cache is None:
+        return None, None
+    key = decodeCache.content_key(contents)
+    cached = cache.get(key)
+    return key, _from_cache(cached) if cached is not None else None
+
+def store_decoded(key: str | None, decoded_values: DecodedValues):
+    """Caches the values decoded from the image of a lookup_decoded key."""
+    cache = decodeCache.get_cache()
+    # Only successful decodes are cached, so a transient failure is retried next time
+    if cache is not None and key is not None and decoded_values:
+        cache.set(key, {"backend": decoded_values.backend, "values": list(decoded_values),
+                        "frames": decoded_values.frames})
+
+def observe_decoded(decoded_values: DecodedValues):
+    """Records the metrics of a fresh decode; a no-op for values served from the cache."""
+    stats = decoded_values.stats
+    if stats is not None:
+        metrics.observe_decode(stats.size_bytes, stats.dimensions, stats.seconds, stats.result)
+
+def decode_qr_from_image_bytes(contents: bytes) -> DecodedValues:
+    """
+    Same as decode_qr_from_file_content, without the decode cache.
+
+    Every frame of a multi-frame image and, with pypdfium2 installed, every page of a
+    PDF is decoded, in parallel. This is the function run on the decode engine: with
+    DECODE_POOL_KIND=process it runs in a child process, where a cache or metrics would
+    be private, so the caller records the returned `stats` with observe_decoded.
+    """
+    from PIL import Image
+
+    started = time.perf_counter()
+    dimensions = None
     try:
-        # Open the image file using Pillow
-        image_buffer = io.BytesIO(contents)
-        img = Image.open(image_buffer)
-        return decode_qr_from_image_object(img)
-    except FileNotFoundError:
-        print(f"Error: File not found at '{file_path}'")
-        return []
+        if is_pdf(contents):
+            decoded_values = decode_qr_from_pdf(contents)
+        else:
+            # Open the image file using Pillow
+            image_buffer = io.BytesIO(contents)
+            img = Image.open(image_buffer)
+            dimensions = img.size
+            if getattr(img, 'n_frames', 1) > 1:
+                decoded_values = decode_qr_from_frames(img)
+            else:
+                _check_frame_limits(1, img.size[0] * img.size[1])
+                decoded_values = decode_qr_from_image_object(img, reopen=lambda: Image.open(io.BytesIO(contents)))
+    except DecoderUnavailableError:
+        raise
+    except ImageLimitError as e:
+        logger.info("Image rejected", extra={"bytes": len(contents), "error": str(e)})
+        return DecodedValues(error=str(e),
+                             stats=DecodeStats(len(contents), dimensions, time.perf_counter() - started, 'error'))
     except Exception as e:
         # Catches potential errors during file opening or image processing
-        print(f"Error opening or processing image file '{file_path}': {e}")
-        return []
+        logger.warning("Could not open or process image file content", extra={"bytes": len(contents), "error": str(e)})
+        return DecodedValues(stats=DecodeStats(len(contents), dimensions, time.perf_counter() - started, 'error'))
+    decoded_values.stats = DecodeStats(len(contents), dimensions, time.perf_counter() - started,
+                                       'found' if decoded_values else 'empty')
+    return decoded_values
+
+def _from_cache(entry) -> DecodedValues:
+    # Entries cached before backends were recorded are plain lists of values
+    if isinstance(entry, list):
+        return DecodedValues(entry)
+    return DecodedValues(entry["values"], entry["backend"], entry.get("frames"))
+
+def join_decoded_values(values: list[str]) -> str:
+    """Joins the QR codes found in one image into the single data value of a QR record."""
+    return '\n'.join(values)
 
-def decode_qr_from_base64(base64_string: str) -> list[str]:
+def normalize_base64(base64_string: str) -> str:
+    """
+    Strips an optional data URL header (e.g. 'data:image/png;base64,') and whitespace,
+    then restores any missing '=' padding.
+    """
+    if base64_string.startswith('data:'):
+        _, _, base64_string = base64_string.partition(',')
+    base64_string = ''.join(base64_string.split())
+    return base64_string + '=' * (-len(base64_string) % 4)
+
+def decode_qr_from_base64(base64_string: str) -> DecodedValues:
     """
     Decodes a Base64 encoded image string, decodes any QR codes found,
     and returns their values.
@@ -106,21 +484,107 @@ def decode_qr_from_base64(base64_string: str) -> list[str]:
     Returns:
         A list of decoded QR code data strings, or an empty list on failure/not found.
     """
+    image_bytes = decode_base64_image(base64_string)
+    if image_bytes is None:
+        return DecodedValues()
+    # The cache is keyed by the decoded image bytes, the same as file uploads
+    return decode_qr_from_file_content(image_bytes)
+
+def decode_base64_image(base64_string: str) -> bytes | None:
+    """Returns the image bytes of a Base64 encoded image string, or None when it is not valid Base64."""
     try:
         # Decode the Base64 string into bytes
-        image_bytes = base64.b64decode(base64_string)
-        # Create an in-memory bytes buffer from the decoded bytes
-        image_buffer = io.BytesIO(image_bytes)
-        # Open the image from the buffer using Pillow
-        img = Image.open(image_buffer)
-
-        return decode_qr_from_image_object(img)
-
+        return base64.b64decode(normalize_base64(base64_string))
     except base64.binascii.Error as e:
         # Error specific to base64 decoding
-        print(f"Error: Invalid Base64 string provided. {e}")
-        return []
-    except Exception as e:
-        # Catches potential errors during bytes handling or image processing
-        print(f"Error processing Base64 image data: {e}")
-        return []
+        logger.info("Invalid Base64 image string", extra={"error": str(e)})
+        return None
+
+def is_zip_archive(filename: str | None, contents: bytes) -> bool:
+    """
+    Checks whether an uploaded file is a ZIP archive, by extension or by magic number.
+    """
+    if filename and filename.lower().endswith('.zip'):
+        return True
+    return contents[:4] == b'PK\x03\x04'
+
+def extract_zip_images(contents: bytes, max_entries: int, max_entry_bytes: int | None = None,
+                       max_total_bytes: int | None = None) -> list[tuple[str, bytes]]:
+    """
+    Reads every file entry of a ZIP archive into memory.
+
+    Entries are read with a bounded read, so an entry whose header under-reports its
+    size is still stopped at the limits.
+
+    Args:
+        contents: The raw bytes of the ZIP archive.
+        max_entries: The maximum number of file entries accepted from the archive, e.g. what
+            is left of a batch limit.
+        max_entry_bytes: The maximum uncompressed size of a single entry.
+        max_total_bytes: The maximum uncompressed size of all entries together, e.g. what
+            is left of a batch limit.
+
+    Returns:
+        A list of (entry name, entry bytes) tuples, in archive order.
+
+    Raises:
+        ValueError: If the archive is invalid, holds more than max_entries files,
+            holds an entry larger than max_entry_bytes or more than max_total_bytes in all.
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(contents)) as archive:
+            entries = [info for info in archive.infolist() if not info.is_dir()]
+            if len(entries) > max_entries:
+                raise ValueError(f"ZIP archive holds {len(entries)} files, the limit is {max_entries}")
+            # Reject on the sizes the headers declare before decompressing anything
+            declared = 0
+            for info in entries:
+                if max_entry_bytes is not None and info.file_size > max_entry_bytes:
+                    raise ValueError(f"{info.filename} is {info.file_size} bytes, the limit is {max_entry_bytes}")
+                declared += info.file_size
+            if max_total_bytes is not None and declared > max_total_bytes:
+                raise ValueError(f"ZIP archive holds {declared} bytes uncompressed, the limit is {max_total_bytes}")
+
+            images = []
+            total = 0
+            for info in entries:
+                limit = max_entry_bytes
+                if max_total_bytes is not None:
+                    remaining = max_total_bytes - total
+                    limit = remaining if limit is None else min(limit, remaining)
+                with archive.open(info) as entry:
+                    data = entry.read() if limit is None else entry.read(limit + 1)
+                if limit is not None and len(data) > limit:
+                    if max_entry_bytes is not None and len(data) > max_entry_bytes:
+                        raise ValueError(f"{info.filename} is over the limit of {max_entry_bytes} bytes")
+                    raise ValueError(f"ZIP archive is over the limit of {max_total_bytes} bytes uncompressed")
+                total += len(data)
+                images.append((info.filename, data))
+            return images
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid ZIP archive: {e}")
+
+def profile_decode(file_path: str) -> dict:
+    """
+    Decodes one image file and reports the time spent in each pipeline stage.
+
+    Used to tune the preprocessing Settings against real images, e.g.:
+        python -m qr-fastapi-python.utility.qrUtil sample/*.png
+
+    Returns:
+        A dict with the file size, pixel dimensions, decoded values and stage timings in milliseconds.
+    """
+    from PIL import Image
+
+    timings = {}
+    started = time.perf_counter()
+    img = Image.open(file_path)
+    _record(timings, 'open', started)
+    size = img.size
+    values = decode_qr_from_image_object(img, reopen=lambda: Image.open(file_path), timings=timings)
+    timings['total'] = round((time.perf_counter() - started) * 1000, 3)
+    return {"file": file_path, "size": size, "values": values, "backend": values.backend, "timings_ms": timings}
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        print(profile_decode(path))
@@ -0,0 +1,73 @@
+from fastapi import HTTPException, Request, UploadFile, status
+
+from ..config.config import settings
+
+
+def _too_large(size: int | None = None):
+    received = f" ({size} bytes)" if size is not None else ""
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Image is too large{received}. The limit is {settings.qr_upload_max_bytes} bytes.")
+
+
+def read_upload_file(file: UploadFile) -> bytes:
+    """
+    Reads an UploadFile, refusing anything larger than the configured upload limit.
+
+    At most one byte past the limit is read, so an oversize upload is never fully loaded.
+    """
+    max_bytes = settings.qr_upload_max_bytes
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(file.size)
+    contents = file.file.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        raise _too_large()
+    return contents
+
+
+async def read_upload_file_async(file: UploadFile) -> bytes:
+    """Same as read_upload_file, without blocking the event loop on the spooled file."""
+    max_bytes = settings.qr_upload_max_bytes
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(file.size)
+    contents = await file.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        raise _too_large()
+    return contents
+
+
+def check_base64_length(base64_string: str):
+    """Rejects a base64 string whose decoded size would exceed the upload limit."""
+    if len(base64_string) * 3 // 4 > settings.qr_upload_max_bytes + 3:
+        raise _too_large(len(base64_string) * 3 // 4)
+
+
+async def read_raw_image_body(request: Request) -> bytes:
+    """
+    Dependency streaming a raw application/octet-stream or image/* request body.
+
+    Oversize bodies are rejected from the Content-Length header before any byte is
+    read, or as soon as the streamed size passes the limit. The chunks are joined
+    once into a single bytes object that Pillow reads without further copies.
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type != 'application/octet-stream' and not content_type.startswith('image/'):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Send the image as application/octet-stream or image/* body.")
+
+    max_bytes = settings.qr_upload_max_bytes
+    declared = request.headers.get('content-length')
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise _too_large(int(declared))
+
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise _too_large()
+        chunks.append(chunk)
+
+    if received == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Request body is empty.")
+    return chunks[0] if len(chunks) == 1 else b''.join(chunks)